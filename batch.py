@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Crawl de varios sitios en paralelo para CAPTCHA Crawler by @M4rt1n_0x1337
+
+Cada sitio usa su propio CaptchaCrawler (y su navegador). El número de sitios activos
+lo limita un AdaptiveConcurrency, de modo que con control adaptativo el lote crece
+mientras el nodo aguante y se reduce cuando suben la CPU, la memoria, la latencia o
+los timeouts. Un único despachador espera hueco, así que lotes de miles de URLs no
+dejan miles de tareas esperando.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional, Dict, List, Any, Callable, Awaitable, Iterable
+
+from concurrency import AdaptiveConcurrency
+
+logger = logging.getLogger(__name__)
+
+
+def read_url_list(path: str) -> List[str]:
+    """Leer una lista de URLs (una por línea; se ignoran líneas vacías y comentarios '#')"""
+    urls = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#') and line not in urls:
+                urls.append(line)
+    return urls
+
+
+def failed_result(url: str, error: str) -> Dict[str, Any]:
+    """Resultado de un sitio cuyo crawl no llegó a ejecutarse"""
+    return {'start_url': url, 'success': False, 'timestamp': datetime.now().isoformat(),
+            'captcha_found': False, 'captcha_solved': False, 'pages_visited': 0,
+            'visited_urls': [], 'error': error}
+
+
+async def crawl_batch(urls: Iterable[str], make_crawler: Callable[[], Any],
+                      sites: AdaptiveConcurrency,
+                      on_result: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+                      ) -> List[Dict[str, Any]]:
+    """Crawlear cada URL con un crawler nuevo, respetando el límite de sitios activos.
+
+    Los resultados se devuelven en el orden de entrada; on_result se llama según terminan.
+    """
+    async def crawl_site(url: str) -> Dict[str, Any]:
+        crawler = None
+        try:
+            crawler = make_crawler()
+            result = await crawler.crawl_url(url)
+        except Exception as e:
+            logger.error(f"Error crawleando {url}: {e}")
+            result = failed_result(url, str(e))
+        finally:
+            if crawler is not None:
+                await crawler.close_browser()
+            sites.release()
+        if on_result:
+            await on_result(result)
+        return result
+
+    tasks = []
+    try:
+        for url in urls:
+            await sites.acquire()
+            tasks.append(asyncio.ensure_future(crawl_site(url)))
+        return list(await asyncio.gather(*tasks))
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Perfiles de navegador para CAPTCHA Crawler by @M4rt1n_0x1337
+
+'standard' reproduce la configuración original (ventana 1920x1080, geolocalización,
+sin límites). 'lean' reduce la huella por crawl para meter más crawls por nodo:
+ventana menor, caché de disco desactivada o acotada, límite de procesos renderer,
+heap de JS acotado y servicios de fondo de Chromium desactivados.
+
+También incluye la medición de RSS y CPU del árbol de procesos del navegador para
+dimensionar contenedores.
+"""
+
+import os
+from typing import Optional, Dict, List, Any
+
+# Flags comunes a todos los perfiles
+BASE_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--disable-site-isolation-trials',
+    '--disable-web-security',
+    '--disable-dev-shm-usage',
+    '--no-sandbox',
+    '--disable-gpu'
+]
+
+# Chromium solo respeta un --disable-features, así que las features se combinan en uno
+BASE_DISABLED_FEATURES = ['IsolateOrigins', 'site-per-process']
+
+BROWSER_PROFILES: Dict[str, Dict[str, Any]] = {
+    'standard': {
+        'viewport': {'width': 1920, 'height': 1080},
+        'geolocation': True,
+        'args': [],
+        'disabled_features': [],
+        'disk_cache_bytes': None,       # None = sin límite
+        'renderer_process_limit': None,
+        'js_heap_mb': None
+    },
+    'lean': {
+        'viewport': {'width': 1280, 'height': 720},
+        'geolocation': False,
+        'args': [
+            '--disable-extensions',
+            '--disable-background-networking',
+            '--disable-component-update',
+            '--disable-default-apps',
+            '--disable-sync',
+            '--disable-breakpad',
+            '--metrics-recording-only',
+            '--mute-audio',
+            '--no-first-run'
+        ],
+        'disabled_features': ['Translate', 'MediaRouter', 'OptimizationHints', 'BackForwardCache'],
+        'disk_cache_bytes': 0,          # 0 = caché de disco desactivada
+        'renderer_process_limit': 2,
+        'js_heap_mb': 512
+    }
+}
+
+
+def get_browser_profile(name: str, **overrides) -> Dict[str, Any]:
+    """Obtener un perfil por nombre, con valores sobrescritos opcionalmente"""
+    if name not in BROWSER_PROFILES:
+        raise ValueError(f"Perfil de navegador desconocido: {name} (disponibles: {', '.join(BROWSER_PROFILES)})")
+    profile = dict(BROWSER_PROFILES[name])
+    profile.update({key: value for key, value in overrides.items() if value is not None})
+    profile['name'] = name
+    return profile
+
+
+def chromium_args(profile: Dict[str, Any]) -> List[str]:
+    """Construir los argumentos de lanzamiento de Chromium para un perfil"""
+    args = list(BASE_ARGS) + list(profile['args'])
+    args.append('--disable-features=' + ','.join(BASE_DISABLED_FEATURES + profile['disabled_features']))
+
+    disk_cache_bytes = profile['disk_cache_bytes']
+    if disk_cache_bytes is not None:
+        # Chromium interpreta 0 como "tamaño por defecto"; 1 byte la deja inutilizable
+        cache_size = max(1, disk_cache_bytes)
+        args.append(f'--disk-cache-size={cache_size}')
+        args.append(f'--media-cache-size={cache_size}')
+    if profile['renderer_process_limit']:
+        args.append(f"--renderer-process-limit={profile['renderer_process_limit']}")
+    if profile['js_heap_mb']:
+        args.append(f"--js-flags=--max-old-space-size={profile['js_heap_mb']}")
+    return args
+
+
+def context_options(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Opciones de new_context() que dependen del perfil"""
+    options: Dict[str, Any] = {'viewport': profile['viewport']}
+    if profile['geolocation']:
+        options['geolocation'] = {'latitude': 40.4168, 'longitude': -3.7038}  # Madrid
+        options['permissions'] = ['geolocation']
+    return options
+
+
+def _children_map() -> Dict[int, List[int]]:
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def process_tree_usage(root_pid: Optional[int] = None, include_root: bool = False) -> Optional[Dict[str, float]]:
+    """RSS y CPU acumulada de los procesos descendientes (driver de Playwright y Chromium).
+
+    Con include_root se suma también el propio root_pid (p. ej. el proceso principal de
+    Chromium). Solo Linux (/proc); devuelve None en otros sistemas.
+    """
+    if not os.path.isdir('/proc'):
+        return None
+    root_pid = root_pid or os.getpid()
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    clock_ticks = os.sysconf('SC_CLK_TCK')
+
+    children = _children_map()
+    pending = [root_pid] if include_root else list(children.get(root_pid, []))
+    rss_bytes = 0
+    cpu_seconds = 0.0
+    processes = 0
+    while pending:
+        pid = pending.pop()
+        pending.extend(children.get(pid, []))
+        try:
+            with open(f'/proc/{pid}/statm') as f:
+                rss_bytes += int(f.read().split()[1]) * page_size
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            cpu_seconds += (int(fields[11]) + int(fields[12])) / clock_ticks  # utime + stime
+            processes += 1
+        except (OSError, IndexError, ValueError):
+            continue
+    return {'rss_mb': round(rss_bytes / (1024 * 1024), 1), 'cpu_seconds': round(cpu_seconds, 2),
+            'processes': processes}
+
+
+def summarize_usage(samples: List[Dict[str, float]], baseline: Optional[Dict[str, float]],
+                    pages: int) -> Dict[str, Any]:
+    """Resumir las muestras de un crawl: RSS medio/pico y CPU por página"""
+    if not samples:
+        return {}
+    cpu_start = baseline['cpu_seconds'] if baseline else 0.0
+    # Un proceso hijo que termina se lleva su CPU: la diferencia nunca se da como negativa
+    cpu_total = max(0.0, samples[-1]['cpu_seconds'] - cpu_start)
+    return {
+        'samples': len(samples),
+        'rss_mb_avg': round(sum(sample['rss_mb'] for sample in samples) / len(samples), 1),
+        'rss_mb_peak': max(sample['rss_mb'] for sample in samples),
+        'processes_peak': max(sample['processes'] for sample in samples),
+        'cpu_seconds_total': round(cpu_total, 2),
+        'cpu_seconds_per_page': round(cpu_total / pages, 2) if pages else None
+    }
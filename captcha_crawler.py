@@ -11,34 +11,329 @@ import logging
 import json
 import string
 import os
-from typing import Optional, Dict, List, Any
+from collections import deque
+from typing import Optional, Dict, List, Any, Callable, TYPE_CHECKING
 from urllib.parse import urljoin, urlparse
 from datetime import datetime
 
-try:
-    from playwright.async_api import async_playwright, Page, TimeoutError as PlaywrightTimeoutError
-except ImportError:
-    print("Error: playwright no está instalado. Ejecuta: pip install playwright")
-    print("Luego ejecuta: playwright install")
-    exit(1)
-
-try:
-    import httpx
-except ImportError:
-    print("Error: httpx no está instalado. Ejecuta: pip install httpx")
-    exit(1)
-
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('captcha_crawler.log'),
-        logging.StreamHandler()
-    ]
-)
+from browser_profiles import (get_browser_profile, chromium_args, context_options,
+                              process_tree_usage, summarize_usage)
+from capture_archive import CaptureArchive, rescore_archive
+from concurrency import AdaptiveConcurrency, LoadMonitor
+from crawl_scope import CrawlScope, registrable_domain
+from crawler_logging import log_context, set_log_context
+from evidence import EvidenceStore
+from retry_policy import RetryPolicy, TRANSIENT, classify_error, classify_status
+from signatures import SignatureModel
+
+if TYPE_CHECKING:
+    from playwright.async_api import Page
+
+# La configuración de logging corresponde a la aplicación (ver cli.py), no a la librería
 logger = logging.getLogger(__name__)
 
+
+def load_playwright():
+    """Importar Playwright bajo demanda para que importar este módulo no tenga coste"""
+    try:
+        from playwright import async_api
+    except ImportError as e:
+        raise ImportError(
+            "playwright no está instalado. Ejecuta: pip install playwright && playwright install"
+        ) from e
+    return async_api
+
+USER_AGENT = ('Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) '
+              'Chrome/120.0.0.0 Safari/537.36')
+
+EXTRA_HTTP_HEADERS = {
+    'Accept-Language': 'es-ES,es;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1'
+}
+
+# Script para ocultar automatización (en el contexto, para que también se aplique
+# a las pestañas abiertas en segundo plano)
+STEALTH_INIT_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined,
+    });
+
+    Object.defineProperty(navigator, 'plugins', {
+        get: () => [1, 2, 3, 4, 5],
+    });
+
+    Object.defineProperty(navigator, 'languages', {
+        get: () => ['es-ES', 'es', 'en'],
+    });
+
+    window.chrome = {
+        runtime: {},
+    };
+"""
+
+
+async def launch_browser(playwright, profile: Dict[str, Any], headless: bool = True,
+                         executable_path: Optional[str] = None):
+    """Lanzar Chromium con los argumentos del perfil de navegador"""
+    return await playwright.chromium.launch(
+        headless=headless,
+        executable_path=executable_path,
+        args=chromium_args(profile)
+    )
+
+
+async def create_context(browser, profile: Dict[str, Any]):
+    """Crear un contexto con configuración realista, sin estado de ningún crawl"""
+    context = await browser.new_context(
+        user_agent=USER_AGENT,
+        locale='es-ES',
+        timezone_id='Europe/Madrid',
+        **context_options(profile)
+    )
+    await context.set_extra_http_headers(EXTRA_HTTP_HEADERS)
+    await context.add_init_script(STEALTH_INIT_SCRIPT)
+    return context
+
+# Atributo con el que se marcan los elementos indexados para obtener locators estables
+INTERACTION_TARGET_ATTRIBUTE = 'data-cc-target'
+
+# Script de indexado: recorre todas las categorías en una sola evaluación y devuelve
+# rol, texto, visibilidad y bounding box de cada elemento candidato
+INTERACTION_INDEX_SCRIPT = """
+(spec) => {
+    const described = new Map();
+    let nextId = 0;
+
+    const implicitRole = (el) => {
+        const explicit = el.getAttribute('role');
+        if (explicit) return explicit;
+        const tag = el.tagName.toLowerCase();
+        const type = (el.getAttribute('type') || '').toLowerCase();
+        if (tag === 'a') return 'link';
+        if (tag === 'button') return 'button';
+        if (tag === 'select') return 'combobox';
+        if (tag === 'textarea') return 'textbox';
+        if (tag === 'input') {
+            if (['submit', 'button', 'reset', 'image'].includes(type)) return 'button';
+            if (type === 'checkbox') return 'checkbox';
+            if (type === 'radio') return 'radio';
+            return 'textbox';
+        }
+        return 'generic';
+    };
+
+    const resolveHref = (el) => {
+        const link = el.matches('a[href]') ? el : (el.querySelector('a[href]') || el.closest('a[href]'));
+        return link ? link.href : null;
+    };
+
+    const describe = (el) => {
+        if (described.has(el)) return described.get(el);
+        const id = spec.generation + '-' + (nextId++);
+        el.setAttribute(spec.attribute, id);
+        const rect = el.getBoundingClientRect();
+        const style = window.getComputedStyle(el);
+        const info = {
+            id: id,
+            tag: el.tagName.toLowerCase(),
+            role: implicitRole(el),
+            text: (el.innerText || el.value || '').trim().slice(0, 200),
+            href: resolveHref(el),
+            type: el.getAttribute('type'),
+            visible: rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden',
+            bbox: {
+                x: rect.x + window.scrollX,
+                y: rect.y + window.scrollY,
+                width: rect.width,
+                height: rect.height
+            }
+        };
+        described.set(el, info);
+        return info;
+    };
+
+    const index = {};
+    for (const [category, rules] of Object.entries(spec.categories)) {
+        const entries = [];
+        rules.forEach((rule, ruleIndex) => {
+            let matches;
+            try {
+                matches = Array.from(document.querySelectorAll(rule.selector));
+            } catch (e) {
+                return;
+            }
+            if (rule.text) {
+                const needle = rule.text.toLowerCase();
+                matches = matches.filter(
+                    (el) => (el.innerText || el.value || '').toLowerCase().includes(needle)
+                );
+            }
+            matches.slice(0, spec.limit).forEach((el, order) => {
+                entries.push(Object.assign({}, describe(el), {rule: ruleIndex, order: order}));
+            });
+        });
+        index[category] = entries;
+    }
+    return index;
+}
+"""
+
+# Evidencia de un frame en una sola evaluación: texto visible, selectores de firma
+# presentes (con su src si son iframes) y los src de los scripts
+FRAME_SIGNATURE_SCRIPT = """
+(spec) => {
+    const selectors = [];
+    const srcs = {};
+    for (const selector of spec.selectors) {
+        let element = null;
+        try {
+            element = document.querySelector(selector);
+        } catch (e) {
+            continue;
+        }
+        if (element) {
+            selectors.push(selector);
+            if (element.getAttribute('src')) srcs[selector] = element.getAttribute('src');
+        }
+    }
+    const body = document.body;
+    return {
+        text: body ? (body.innerText || '').slice(0, spec.maxText) : '',
+        selectors: selectors,
+        srcs: srcs,
+        scripts: Array.from(document.scripts).map((script) => script.src).filter((src) => src)
+    };
+}
+"""
+
+# Driver de scroll dentro de la página: una sola evaluación que baja paso a paso con pausas
+# humanas, sigue mientras scrollHeight crezca (scroll infinito) y, al llegar al final, espera
+# a que el contenido diferido termine de cargar (IntersectionObserver + requestAnimationFrame)
+SCROLL_DRIVER_SCRIPT = """
+async (spec) => {
+    const started = performance.now();
+    const scroller = document.scrollingElement || document.documentElement;
+    const height = () => Math.max(scroller.scrollHeight, document.body ? document.body.scrollHeight : 0);
+    const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+    // requestAnimationFrame no se dispara en pestañas ocultas: se acota con un timeout
+    const nextFrame = () => Promise.race([
+        new Promise((resolve) => requestAnimationFrame(() => resolve())),
+        sleep(100)
+    ]);
+    const pause = () => sleep(spec.pauseMin + Math.random() * (spec.pauseMax - spec.pauseMin));
+    const elapsed = () => performance.now() - started;
+
+    // Contenido diferido: se cuenta cuándo entra en la ventana y cuándo termina de cargar
+    const watched = new Set();
+    let revealed = 0, loaded = 0, pending = 0;
+    const trackLoad = (el) => {
+        // Solo las imágenes informan de forma fiable si ya han cargado (complete)
+        if (el.tagName !== 'IMG' || el.complete) {
+            loaded++;
+            return;
+        }
+        pending++;
+        const done = () => { pending--; loaded++; };
+        el.addEventListener('load', done, {once: true});
+        el.addEventListener('error', done, {once: true});
+    };
+    const observer = 'IntersectionObserver' in window ? new IntersectionObserver((entries) => {
+        for (const entry of entries) {
+            if (!entry.isIntersecting) continue;
+            revealed++;
+            observer.unobserve(entry.target);
+            trackLoad(entry.target);
+        }
+    }) : null;
+    const observeNew = () => {
+        if (!observer) return;
+        document.querySelectorAll(spec.lazySelector).forEach((el) => {
+            if (!watched.has(el)) {
+                watched.add(el);
+                observer.observe(el);
+            }
+        });
+    };
+    let mutations = 0;
+    const mutationObserver = new MutationObserver((records) => { mutations += records.length; });
+    mutationObserver.observe(document.documentElement, {childList: true, subtree: true});
+
+    // Esperar a que la altura, el DOM y las cargas diferidas estén quietos settleMs seguidos
+    const settle = async () => {
+        const deadline = performance.now() + spec.settleTimeout;
+        let lastHeight = height(), lastMutations = mutations, quietSince = performance.now();
+        while (performance.now() < deadline) {
+            await nextFrame();
+            observeNew();
+            if (height() !== lastHeight || mutations !== lastMutations || pending > 0) {
+                lastHeight = height();
+                lastMutations = mutations;
+                quietSince = performance.now();
+            } else if (performance.now() - quietSince >= spec.settleMs) {
+                return;
+            }
+            await sleep(50);
+        }
+    };
+
+    const initialHeight = height();
+    const viewport = window.innerHeight || 800;
+    const step = Math.max(100, Math.floor(viewport * spec.stepRatio));
+    let position = scroller.scrollTop;
+    let deepest = position + viewport;
+    let steps = 0, growths = 0, stopReason = 'bottom';
+    observeNew();
+
+    while (true) {
+        if (steps >= spec.maxSteps) { stopReason = 'max_steps'; break; }
+        if (elapsed() >= spec.maxDuration) { stopReason = 'max_duration'; break; }
+        const currentHeight = height();
+        if (position + viewport >= currentHeight) {
+            await settle();
+            if (height() <= currentHeight) break;
+            if (height() > spec.maxHeight) { stopReason = 'max_height'; break; }
+            growths++;
+            continue;
+        }
+        position = Math.min(position + step, currentHeight - viewport);
+        window.scrollTo(0, position);
+        steps++;
+        deepest = Math.max(deepest, position + viewport);
+        await nextFrame();
+        observeNew();
+        await pause();
+    }
+
+    // Vuelta hacia arriba (comportamiento humano)
+    for (const fraction of spec.returnTo) {
+        window.scrollTo(0, height() * fraction);
+        await pause();
+    }
+
+    mutationObserver.disconnect();
+    if (observer) observer.disconnect();
+    const finalHeight = height();
+    return {
+        steps: steps,
+        growths: growths,
+        initial_height: initialHeight,
+        final_height: finalHeight,
+        coverage: finalHeight ? Math.min(1, deepest / finalHeight) : 1,
+        lazy_watched: watched.size,
+        lazy_revealed: revealed,
+        lazy_loaded: loaded,
+        lazy_pending: pending,
+        mutations: mutations,
+        stop_reason: stopReason,
+        duration_ms: Math.round(elapsed())
+    };
+}
+"""
+
 class CaptchaCrawler:
     """Crawler inteligente con capacidad de superar CAPTCHAs
     by @M4rt1n_0x1337"""
@@ -49,38 +344,158 @@ class CaptchaCrawler:
         self.browser = None
         self.context = None
         self.page = None
+        self._owns_browser = True  # False si navegador y contexto vienen de un pool
         self.visited_urls = set()
         self.max_pages = 50  # Máximo de páginas a visitar
+        self.scope_config: Dict[str, Any] = {}  # Opciones de CrawlScope (include, exclude, ...)
+        self.scope: Optional[CrawlScope] = None  # Alcance del crawl en curso
+        self.max_links_per_page = 10
+        self.retry_options: Dict[str, Any] = {}  # Opciones de RetryPolicy (max_attempts, site_budget, ...)
+        self.retry: Optional[RetryPolicy] = None  # Reintentos y circuitos por host del crawl en curso
         self.captcha_found = False
         self.captcha_solved = False
         
-        # Patrones de CAPTCHA comunes
-        self.captcha_patterns = [
-            r'captcha',
-            r'recaptcha',
-            r'hcaptcha',
-            r'cloudflare',
-            r'bot.?detection',
-            r'security.?check',
-            r'verify.?human',
-            r'prove.?you.?are.?human',
-            r'anti.?bot',
-            r'challenge'
-        ]
-        
-        # Selectores comunes de CAPTCHA
-        self.captcha_selectors = [
-            'iframe[src*="recaptcha"]',
-            'iframe[src*="hcaptcha"]',
-            '.g-recaptcha',
-            '.h-captcha',
-            '#captcha',
-            '.captcha',
-            '[data-sitekey]',
-            '.cf-challenge-form',
-            '#challenge-form'
-        ]
-        
+        # Firmas ponderadas de CAPTCHA con umbral de confianza por proveedor
+        self.signature_model = SignatureModel()
+        self.max_frame_text = 200000  # Caracteres de texto visible analizados por frame
+
+        # Categorías de elementos interactivos. Las reglas con 'text' sustituyen al
+        # pseudo-selector :contains(), que Playwright no soporta
+        self.interaction_categories = {
+            'buttons': [
+                {'selector': 'button[type="submit"]'},
+                {'selector': 'input[type="submit"]'},
+                {'selector': 'button', 'text': 'Siguiente'},
+                {'selector': 'button', 'text': 'Next'},
+                {'selector': 'button', 'text': 'Continuar'},
+                {'selector': 'button', 'text': 'Continue'},
+                {'selector': 'button', 'text': 'Ver más'},
+                {'selector': 'button', 'text': 'Load more'},
+                {'selector': 'a', 'text': 'Siguiente'},
+                {'selector': 'a', 'text': 'Next'},
+                {'selector': '.btn'},
+                {'selector': '.button'},
+                {'selector': '[role="button"]'}
+            ],
+            'dynamic': [
+                {'selector': 'button', 'text': 'Load'},
+                {'selector': 'button', 'text': 'More'},
+                {'selector': 'button', 'text': 'Show'},
+                {'selector': 'button', 'text': 'Cargar'},
+                {'selector': 'button', 'text': 'Más'},
+                {'selector': 'button', 'text': 'Ver'},
+                {'selector': '.load-more'},
+                {'selector': '.show-more'},
+                {'selector': '.expand'},
+                {'selector': '.toggle'}
+            ],
+            'hoverable': [
+                {'selector': 'a, button, .clickable, [onclick]'}
+            ],
+            'filters': [
+                {'selector': '.filter'},
+                {'selector': '.filters input'},
+                {'selector': '.sidebar input[type="checkbox"]'},
+                {'selector': '.facet input'},
+                {'selector': '.search-filter'},
+                {'selector': '.category-filter'}
+            ],
+            'pagination': [
+                {'selector': '.pagination a'},
+                {'selector': '.pager a'},
+                {'selector': '.page-numbers a'},
+                {'selector': 'a[aria-label*="Next"]'},
+                {'selector': 'a[aria-label*="Siguiente"]'},
+                {'selector': '.next-page'},
+                {'selector': '.page-next'},
+                {'selector': '[data-page]'}
+            ],
+            'tabs': [
+                {'selector': '.tab'},
+                {'selector': '.tabs a'},
+                {'selector': '[role="tab"]'},
+                {'selector': '.product-tab'},
+                {'selector': 'a[href*="#"]'},
+                {'selector': '.nav-tabs a'}
+            ],
+            'products': [
+                {'selector': '.product-card'},
+                {'selector': '.product-item'},
+                {'selector': '.product'},
+                {'selector': '.item-card'},
+                {'selector': '[data-product]'},
+                {'selector': '.card'},
+                {'selector': '.listing-item'},
+                {'selector': '.product-tile'},
+                {'selector': 'article[class*="product"]'},
+                {'selector': 'div[class*="product"]'},
+                {'selector': 'a[href*="product"]'},
+                {'selector': 'a[href*="item"]'}
+            ],
+            'variants': [
+                {'selector': '.quantity-selector'},
+                {'selector': '.size-selector'},
+                {'selector': '.color-selector'},
+                {'selector': 'select[name*="quantity"]'},
+                {'selector': 'select[name*="size"]'},
+                {'selector': '.variant-selector'},
+                {'selector': '.option-selector'}
+            ]
+        }
+        self.interaction_index_limit = 50  # Máximo de elementos por regla
+        self.interaction_action_timeout = 5000  # ms por acción sobre un objetivo indexado
+        self._interaction_index = None
+        self._interaction_index_url = None
+        self._interaction_generation = 0
+        # Opciones por defecto del driver de scroll (SCROLL_DRIVER_SCRIPT); pausas en ms
+        self.scroll_options = {
+            'step_ratio': 1 / 3,        # Fracción de la ventana por paso
+            'pause': (1000, 2500),
+            'settle_ms': 800,           # Quietud necesaria para dar por cargado el contenido diferido
+            'settle_timeout_ms': 5000,
+            'max_steps': 60,
+            'max_height': 60000,        # Parar el scroll infinito al superar esta altura (px)
+            'max_duration_ms': 90000,
+            'return_to': [],            # Fracciones de altura a las que volver al final
+            'lazy_selector': 'img[loading="lazy"], iframe[loading="lazy"], img[data-src], '
+                             '[data-lazy], [data-lazy-src], [data-bg]'
+        }
+        self.scroll_reports: List[Dict[str, Any]] = []  # Estadísticas de cobertura de cada scroll
+        self.max_products = 3  # Máximo de productos a explorar por listado
+        self.product_tab_fanout = 0  # Pestañas de producto en paralelo (0 = clic y volver atrás)
+        # Control adaptativo (ver concurrency.py): señales de carga y límite de pestañas activas,
+        # compartidos entre los crawlers de un lote
+        self.load_monitor: Optional[LoadMonitor] = None
+        self.page_concurrency: Optional[AdaptiveConcurrency] = None
+        self.capture_archive: Optional[CaptureArchive] = None  # Grabar respuestas y DOMs
+        self.replay_archive: Optional[CaptureArchive] = None  # Servir la navegación desde un archivo
+        self._pending_responses: Dict[Any, List[Any]] = {}
+        self.evidence_store: Optional[EvidenceStore] = None  # Guardar evidencias de cada detección
+        self.last_detection: Optional[Dict[str, Any]] = None  # Firma y frame de la última detección
+        self.evidence_records: List[Dict[str, Any]] = []
+        self._evidence_futures: set = set()  # Evidencias de este crawler aún en el almacén compartido
+        self.detections: List[Dict[str, Any]] = []  # Eventos de detección del crawl
+        self.page_visits: List[Dict[str, Any]] = []  # Páginas visitadas con su fecha
+        # Evidencias de iframes por (URL, id de navegación) para no reanalizar frames sin cambios
+        self._frame_verdicts: Dict[tuple, Dict[str, Any]] = {}
+        self._page_requests: Dict[Any, Any] = {}  # URLs pedidas por cada página (evidencia de red)
+        self._frame_navigation_ids: Dict[Any, int] = {}
+        self._navigation_counter = 0
+        self.frame_verdict_cache_size = 1000
+        self.browser_profile = 'standard'  # Ver browser_profiles.BROWSER_PROFILES
+        self.browser_executable: Optional[str] = None  # p. ej. chromium headless-shell
+        self.resource_samples: List[Dict[str, float]] = []
+        self._resource_baseline: Optional[Dict[str, float]] = None
+        self.browser_pid: Optional[int] = None  # Proceso principal de Chromium de este crawler
+        self.resource_sample_interval = 2.0  # Segundos mínimos entre muestras de /proc
+        self._last_resource_sample = 0.0
+        # Referencia de perf_counter para medir el arranque (el CLI la adelanta al inicio del proceso)
+        self.started_at = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+        self.profiler = None  # profiling.CrawlProfiler en modo --profile
+        self.event_listener: Optional[Callable[[str, Dict[str, Any]], None]] = None  # Eventos de progreso
+        self._trace_path: Optional[str] = None  # Traza de Playwright de la página en curso
+
         logger.info("CaptchaCrawler inicializado")
     
     def normalize_url(self, url: str) -> str:
@@ -92,14 +507,108 @@ class CaptchaCrawler:
         return url
     
     def is_same_domain(self, url1: str, url2: str) -> bool:
-        """Verificar si dos URLs pertenecen al mismo dominio"""
+        """Verificar si dos URLs pertenecen al mismo dominio registrable"""
         try:
-            domain1 = urlparse(url1).netloc.lower()
-            domain2 = urlparse(url2).netloc.lower()
-            return domain1 == domain2
-        except:
+            return registrable_domain(urlparse(url1).hostname) == registrable_domain(urlparse(url2).hostname)
+        except ValueError:
             return False
-    
+
+    def get_scope(self, base_url: str) -> CrawlScope:
+        """Alcance del crawl en curso (o uno nuevo para base_url si se usa fuera de un crawl)"""
+        if self.scope is None:
+            self.scope = CrawlScope.from_config(base_url, self.scope_config)
+        return self.scope
+
+    def get_retry_policy(self) -> RetryPolicy:
+        """Política de reintentos del crawl en curso (o una nueva si se usa fuera de un crawl)"""
+        if self.retry is None:
+            self.retry = RetryPolicy(**self.retry_options)
+        return self.retry
+
+    async def build_interaction_index(self, page: Optional['Page'] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Indexar en una sola evaluación todos los elementos interactivos candidatos"""
+        page = page or self.page
+        self._interaction_generation += 1
+        index = await page.evaluate(INTERACTION_INDEX_SCRIPT, {
+            'categories': self.interaction_categories,
+            'attribute': INTERACTION_TARGET_ATTRIBUTE,
+            'generation': self._interaction_generation,
+            'limit': self.interaction_index_limit
+        })
+        # Solo se cachea el índice de la página principal
+        if page is self.page:
+            self._interaction_index = index
+            self._interaction_index_url = page.url
+        logger.debug(f"Índice de interacción construido: {sum(len(v) for v in index.values())} objetivos")
+        return index
+
+    async def get_interaction_index(self, page: Optional['Page'] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Obtener el índice del estado actual de la página, reconstruyéndolo si cambió"""
+        page = page or self.page
+        if (page is not self.page or self._interaction_index is None
+                or self._interaction_index_url != page.url):
+            return await self.build_interaction_index(page)
+        return self._interaction_index
+
+    def invalidate_interaction_index(self):
+        """Marcar el índice como obsoleto (tras un clic o una navegación)"""
+        self._interaction_index = None
+
+    def interaction_targets(self, index: Dict[str, List[Dict[str, Any]]], category: str,
+                            rule: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Objetivos de una categoría, opcionalmente restringidos a una regla"""
+        targets = index.get(category, [])
+        if rule is not None:
+            targets = [target for target in targets if target['rule'] == rule]
+        return targets
+
+    async def pause(self, seconds: float):
+        """Pausa de simulación humana (el profiler la envuelve para atribuir su tiempo)"""
+        await asyncio.sleep(seconds)
+
+    def target_locator(self, target: Dict[str, Any], page: Optional['Page'] = None):
+        """Locator estable para un objetivo del índice"""
+        page = page or self.page
+        return page.locator(f'[{INTERACTION_TARGET_ATTRIBUTE}="{target["id"]}"]').first
+
+    async def click_target(self, target: Dict[str, Any], delay: tuple = (0.5, 1.0)):
+        """Desplazar hasta un objetivo indexado y hacer clic en él"""
+        locator = self.target_locator(target)
+        await locator.scroll_into_view_if_needed(timeout=self.interaction_action_timeout)
+        await self.pause(random.uniform(*delay))
+        await locator.click(timeout=self.interaction_action_timeout)
+        self.invalidate_interaction_index()
+
+    async def scroll_page(self, page: Optional['Page'] = None, **options) -> Dict[str, Any]:
+        """Recorrer la página con el driver de scroll en una sola evaluación.
+
+        Devuelve las estadísticas de cobertura (pasos, crecimientos de altura, fracción
+        recorrida y elementos diferidos cargados).
+        """
+        page = page or self.page
+        options = dict(self.scroll_options, **options)
+        stats = await page.evaluate(SCROLL_DRIVER_SCRIPT, {
+            'stepRatio': options['step_ratio'],
+            'pauseMin': options['pause'][0],
+            'pauseMax': options['pause'][1],
+            'settleMs': options['settle_ms'],
+            'settleTimeout': options['settle_timeout_ms'],
+            'maxSteps': options['max_steps'],
+            'maxHeight': options['max_height'],
+            'maxDuration': options['max_duration_ms'],
+            'returnTo': options['return_to'],
+            'lazySelector': options['lazy_selector']
+        })
+        stats['url'] = page.url
+        self.scroll_reports.append(stats)
+        if page is self.page and stats['mutations']:
+            # El contenido cargado durante el scroll no está en el índice de interacción
+            self.invalidate_interaction_index()
+        logger.debug(f"Scroll de {page.url}: {stats['steps']} pasos, cobertura {stats['coverage']:.0%}, "
+                     f"{stats['growths']} crecimientos, {stats['lazy_loaded']} elementos diferidos "
+                     f"({stats['stop_reason']})")
+        return stats
+
     async def interact_with_page(self) -> bool:
         """Interactuar con elementos de la página para activar posibles CAPTCHAs"""
         try:
@@ -130,7 +639,15 @@ class CaptchaCrawler:
             
             logger.info("Sitio de e-commerce detectado, iniciando navegación profunda")
             
-            # 1. Buscar y hacer clic en tarjetas de productos
+            # 1. Abrir productos en pestañas en segundo plano si el modo está activo
+            if self.product_tab_fanout > 0:
+                if await self.explore_products_in_background():
+                    return True
+                await self.navigate_pagination()
+                await self.interact_with_filters()
+                return False
+
+            # Modo clásico: hacer clic en tarjetas de productos y volver atrás
             product_selectors = [
                 '.product-card', '.product-item', '.product', '.item-card',
                 '[data-product]', '.card', '.listing-item', '.product-tile',
@@ -146,17 +663,17 @@ class CaptchaCrawler:
                         for product in products[:3]:
                             if await product.is_visible() and products_clicked < 3:
                                 await product.scroll_into_view_if_needed()
-                                await asyncio.sleep(random.uniform(1, 2))
+                                await self.pause(random.uniform(1, 2))
                                 
                                 # Simular hover antes del clic
                                 await product.hover()
-                                await asyncio.sleep(random.uniform(0.5, 1))
+                                await self.pause(random.uniform(0.5, 1))
                                 
                                 await product.click()
                                 products_clicked += 1
                                 
                                 # Esperar a que cargue la página del producto
-                                await asyncio.sleep(random.uniform(2, 4))
+                                await self.pause(random.uniform(2, 4))
                                 
                                 # Verificar CAPTCHA después de cada clic
                                 if await self.detect_captcha():
@@ -171,7 +688,7 @@ class CaptchaCrawler:
                                 
                                 # Volver atrás
                                 await self.page.go_back()
-                                await asyncio.sleep(random.uniform(1, 2))
+                                await self.pause(random.uniform(1, 2))
                                 
                                 break
                 except Exception:
@@ -189,49 +706,139 @@ class CaptchaCrawler:
             logger.error(f"Error en navegación profunda de e-commerce: {e}")
             return False
     
-    async def simulate_product_reading(self):
+    async def collect_product_urls(self) -> List[str]:
+        """Recoger las URLs de producto del listado actual en una sola pasada"""
+        index = await self.get_interaction_index()
+        product_urls = []
+        for product in self.interaction_targets(index, 'products'):
+            href = product.get('href')
+            if not product['visible'] or not href or not href.startswith(('http://', 'https://')):
+                continue
+            href = CrawlScope.canonical(href)
+            if href == self.page.url or href in product_urls or not self.get_scope(self.page.url).allows(href):
+                continue
+            product_urls.append(href)
+            if len(product_urls) >= self.max_products:
+                break
+        return product_urls
+
+    async def explore_products_in_background(self) -> bool:
+        """Abrir los productos del listado en pestañas paralelas sin abandonar el listado"""
+        product_urls = await self.collect_product_urls()
+        if not product_urls:
+            return False
+
+        logger.info(f"Abriendo {len(product_urls)} productos en segundo plano "
+                    f"(máximo {self.product_tab_fanout} en paralelo)")
+        semaphore = asyncio.Semaphore(self.product_tab_fanout)
+        PlaywrightTimeoutError = load_playwright().TimeoutError
+        retry = self.get_retry_policy()
+
+        def product_slot():
+            # Con control adaptativo el límite de pestañas lo decide el controlador compartido
+            return self.page_concurrency.slot() if self.page_concurrency else semaphore
+
+        async def visit_product(product_url: str) -> Optional['Page']:
+            async with product_slot():
+                if not retry.allow(product_url):
+                    return None
+                product_page = await self.context.new_page()
+                keep_page = False
+                try:
+                    started = time.perf_counter()
+                    try:
+                        await product_page.goto(product_url, wait_until="domcontentloaded", timeout=self.timeout)
+                        await product_page.wait_for_load_state("load", timeout=self.timeout)
+                    except Exception as e:
+                        if isinstance(e, PlaywrightTimeoutError):
+                            self.record_navigation(time.perf_counter() - started, timed_out=True)
+                        retry.record_failure(product_url, *classify_error(e))
+                        raise
+                    self.record_navigation(time.perf_counter() - started)
+                    retry.record_success(product_url)
+
+                    if await self.detect_captcha(page=product_page):
+                        keep_page = True
+                        return product_page
+
+                    await self.simulate_product_reading(product_page)
+
+                    if await self.detect_captcha(page=product_page):
+                        keep_page = True
+                        return product_page
+                    await self.capture_page_snapshot('product', product_page)
+                    return None
+                except Exception as e:
+                    logger.warning(f"Error explorando producto {product_url}: {e}")
+                    return None
+                finally:
+                    if not keep_page:
+                        self._pending_responses.pop(product_page, None)
+                        await product_page.close()
+
+        tasks = [asyncio.ensure_future(visit_product(product_url)) for product_url in product_urls]
+        captcha_page = None
+        try:
+            for finished in asyncio.as_completed(tasks):
+                product_page = await finished
+                if product_page is not None:
+                    captcha_page = product_page
+                    break
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            for product_page in results:
+                if product_page is not None and product_page is not captcha_page \
+                        and not isinstance(product_page, BaseException):
+                    await product_page.close()
+
+        if captcha_page is None:
+            return False
+
+        # Promover la pestaña con CAPTCHA a página principal para que el flujo normal lo maneje
+        logger.info(f"CAPTCHA encontrado en producto: {captcha_page.url}")
+        await self.page.close()
+        self.page = captcha_page
+        self.invalidate_interaction_index()
+        await self.page.bring_to_front()
+        return True
+
+    async def simulate_product_reading(self, page: Optional['Page'] = None):
         """Simular lectura de página de producto"""
+        page = page or self.page
         try:
             # Scroll gradual por la página del producto
-            scroll_positions = [0.2, 0.4, 0.6, 0.8, 1.0]
-            for position in scroll_positions:
-                await self.page.evaluate(f"window.scrollTo(0, document.body.scrollHeight * {position})")
-                await asyncio.sleep(random.uniform(1, 2))
-            
-            tab_selectors = [
-                '.tab', '.tabs a', '[role="tab"]', '.product-tab',
-                'a[href*="#"]', '.nav-tabs a'
-            ]
-            
-            for selector in tab_selectors:
-                try:
-                    tabs = await self.page.query_selector_all(selector)
-                    if tabs:
-                        for tab in tabs[:2]:  # Máximo 2 tabs
-                            if await tab.is_visible():
-                                await tab.click()
-                                await asyncio.sleep(random.uniform(1, 2))
-                                break
-                        break
-                except Exception:
-                    continue
-            
+            await self.scroll_page(page, step_ratio=0.8, pause=(1000, 2000), max_steps=15)
+            
+            index = await self.get_interaction_index(page)
+            for rule in range(len(self.interaction_categories['tabs'])):
+                tabs = self.interaction_targets(index, 'tabs', rule)
+                if tabs:
+                    for tab in tabs[:2]:  # Máximo 2 tabs
+                        if tab['visible']:
+                            try:
+                                await self.target_locator(tab, page).click(timeout=self.interaction_action_timeout)
+                                self.invalidate_interaction_index()
+                                await self.pause(random.uniform(1, 2))
+                            except Exception:
+                                pass
+                            break
+                    break
+
             # Simular interacción con botones de cantidad o variantes
-            interaction_selectors = [
-                '.quantity-selector', '.size-selector', '.color-selector',
-                'select[name*="quantity"]', 'select[name*="size"]',
-                '.variant-selector', '.option-selector'
-            ]
-            
-            for selector in interaction_selectors:
-                try:
-                    element = await self.page.query_selector(selector)
-                    if element and await element.is_visible():
-                        await element.click()
-                        await asyncio.sleep(random.uniform(0.5, 1))
+            index = await self.get_interaction_index(page)
+            for rule in range(len(self.interaction_categories['variants'])):
+                variants = self.interaction_targets(index, 'variants', rule)
+                if variants and variants[0]['visible']:
+                    try:
+                        await self.target_locator(variants[0], page).click(timeout=self.interaction_action_timeout)
+                        self.invalidate_interaction_index()
+                        await self.pause(random.uniform(0.5, 1))
                         break
-                except Exception:
-                    continue
+                    except Exception:
+                        continue
                     
         except Exception as e:
             logger.error(f"Error simulando lectura de producto: {e}")
@@ -239,27 +846,16 @@ class CaptchaCrawler:
     async def navigate_pagination(self):
         """Navegar por páginas de resultados"""
         try:
-            pagination_selectors = [
-                '.pagination a', '.pager a', '.page-numbers a',
-                'a[aria-label*="Next"]', 'a[aria-label*="Siguiente"]',
-                '.next-page', '.page-next', '[data-page]'
-            ]
-            
-            for selector in pagination_selectors:
-                try:
-                    next_buttons = await self.page.query_selector_all(selector)
-                    if next_buttons:
-                        for button in next_buttons:
-                            button_text = await button.inner_text()
-                            if any(text in button_text.lower() for text in ['next', 'siguiente', '>', '»']):
-                                if await button.is_visible():
-                                    await button.scroll_into_view_if_needed()
-                                    await asyncio.sleep(random.uniform(1, 2))
-                                    await button.click()
-                                    await asyncio.sleep(random.uniform(2, 3))
-                                    return
-                except Exception:
-                    continue
+            index = await self.get_interaction_index()
+            for button in self.interaction_targets(index, 'pagination'):
+                button_text = button['text'].lower()
+                if any(text in button_text for text in ['next', 'siguiente', '>', '»']) and button['visible']:
+                    try:
+                        await self.click_target(button, delay=(1, 2))
+                        await self.pause(random.uniform(2, 3))
+                        return
+                    except Exception:
+                        continue
                     
         except Exception as e:
             logger.error(f"Error navegando paginación: {e}")
@@ -267,24 +863,18 @@ class CaptchaCrawler:
     async def interact_with_filters(self):
         """Interactuar con filtros de búsqueda"""
         try:
-            filter_selectors = [
-                '.filter', '.filters input', '.sidebar input[type="checkbox"]',
-                '.facet input', '.search-filter', '.category-filter'
-            ]
-            
             filters_clicked = 0
-            for selector in filter_selectors:
+            for rule in range(len(self.interaction_categories['filters'])):
+                if filters_clicked >= 2:
+                    break
                 try:
-                    filters = await self.page.query_selector_all(selector)
-                    if filters and filters_clicked < 2:  
-                        for filter_elem in filters[:2]:
-                            if await filter_elem.is_visible() and filters_clicked < 2:
-                                await filter_elem.scroll_into_view_if_needed()
-                                await asyncio.sleep(random.uniform(0.5, 1))
-                                await filter_elem.click()
-                                filters_clicked += 1
-                                await asyncio.sleep(random.uniform(1, 2))
-                                break
+                    index = await self.get_interaction_index()
+                    for filter_elem in self.interaction_targets(index, 'filters', rule)[:2]:
+                        if filter_elem['visible']:
+                            await self.click_target(filter_elem)
+                            filters_clicked += 1
+                            await self.pause(random.uniform(1, 2))
+                            break
                 except Exception:
                     continue
                     
@@ -323,27 +913,8 @@ class CaptchaCrawler:
     async def comprehensive_page_scroll(self):
         """Scroll completo y realista de la página"""
         try:
-            # Obtener altura total de la página
-            page_height = await self.page.evaluate("document.body.scrollHeight")
-            viewport_height = await self.page.evaluate("window.innerHeight")
-            
-            # Scroll gradual hacia abajo
-            current_position = 0
-            scroll_step = viewport_height // 3
-            
-            while current_position < page_height:
-                await self.page.evaluate(f"window.scrollTo(0, {current_position})")
-                await asyncio.sleep(random.uniform(1, 2.5))
-                current_position += scroll_step
-            
-            # Scroll hasta el final
-            await self.page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-            await asyncio.sleep(random.uniform(2, 3))
-            
-            # Scroll de vuelta hacia arriba (comportamiento humano)
-            for position in [0.8, 0.6, 0.4, 0.2, 0]:
-                await self.page.evaluate(f"window.scrollTo(0, document.body.scrollHeight * {position})")
-                await asyncio.sleep(random.uniform(1, 2))
+            # Scroll gradual hasta el final (siguiendo el scroll infinito) y de vuelta hacia arriba
+            await self.scroll_page(return_to=[0.8, 0.6, 0.4, 0.2, 0])
                 
         except Exception as e:
             logger.error(f"Error en scroll comprensivo: {e}")
@@ -361,18 +932,18 @@ class CaptchaCrawler:
                     for input_field in inputs[:3]:  # Máximo 3 campos por formulario
                         if await input_field.is_visible():
                             await input_field.scroll_into_view_if_needed()
-                            await asyncio.sleep(random.uniform(0.5, 1))
+                            await self.pause(random.uniform(0.5, 1))
                             
                             # Simular escritura lenta
                             test_text = "test@example.com" if "email" in str(await input_field.get_attribute('type')) else "test text"
                             await input_field.click()
-                            await asyncio.sleep(random.uniform(0.5, 1))
+                            await self.pause(random.uniform(0.5, 1))
                             
                             for char in test_text:
                                 await input_field.type(char)
-                                await asyncio.sleep(random.uniform(0.1, 0.3))
+                                await self.pause(random.uniform(0.1, 0.3))
                             
-                            await asyncio.sleep(random.uniform(1, 2))
+                            await self.pause(random.uniform(1, 2))
                             
                             # Verificar si apareció CAPTCHA
                             if await self.detect_captcha():
@@ -393,9 +964,9 @@ class CaptchaCrawler:
                 try:
                     if await video.is_visible():
                         await video.scroll_into_view_if_needed()
-                        await asyncio.sleep(random.uniform(1, 2))
+                        await self.pause(random.uniform(1, 2))
                         await video.click()
-                        await asyncio.sleep(random.uniform(2, 3))
+                        await self.pause(random.uniform(2, 3))
                         break
                 except Exception:
                     continue
@@ -406,7 +977,7 @@ class CaptchaCrawler:
                 try:
                     if await iframe.is_visible():
                         await iframe.scroll_into_view_if_needed()
-                        await asyncio.sleep(random.uniform(1, 2))
+                        await self.pause(random.uniform(1, 2))
                         # No hacer clic en iframes, solo asegurar que estén visibles
                 except Exception:
                     continue
@@ -419,13 +990,12 @@ class CaptchaCrawler:
         try:
             # Movimientos de mouse más extensos
             for _ in range(random.randint(5, 10)):
-                x = random.randint(100, 1800)
-                y = random.randint(100, 1000)
+                x, y = self.random_viewport_point()
                 await self.page.mouse.move(x, y)
-                await asyncio.sleep(random.uniform(0.2, 0.5))
+                await self.pause(random.uniform(0.2, 0.5))
             
             # Simular lectura (pausas más largas)
-            await asyncio.sleep(random.uniform(3, 6))
+            await self.pause(random.uniform(3, 6))
             
             # Clicks aleatorios en áreas seguras
             safe_areas = [
@@ -434,7 +1004,7 @@ class CaptchaCrawler:
             
             for x, y in random.sample(safe_areas, 2):
                 await self.page.mouse.click(x, y)
-                await asyncio.sleep(random.uniform(1, 2))
+                await self.pause(random.uniform(1, 2))
                 
         except Exception as e:
             logger.error(f"Error simulando actividad extendida: {e}")
@@ -443,36 +1013,29 @@ class CaptchaCrawler:
         """Intentar activar contenido dinámico que pueda contener CAPTCHAs"""
         try:
             # Buscar botones de "Load More", "Show More", etc.
-            dynamic_triggers = [
-                'button:contains("Load")', 'button:contains("More")', 'button:contains("Show")',
-                'button:contains("Cargar")', 'button:contains("Más")', 'button:contains("Ver")',
-                '.load-more', '.show-more', '.expand', '.toggle'
-            ]
-            
-            for selector in dynamic_triggers:
+            for rule in range(len(self.interaction_categories['dynamic'])):
                 try:
-                    elements = await self.page.query_selector_all(selector)
-                    for element in elements[:2]:
-                        if await element.is_visible():
-                            await element.scroll_into_view_if_needed()
-                            await asyncio.sleep(random.uniform(1, 2))
-                            await element.click()
-                            await asyncio.sleep(random.uniform(2, 4))
-                            
+                    index = await self.get_interaction_index()
+                    for element in self.interaction_targets(index, 'dynamic', rule)[:2]:
+                        if element['visible']:
+                            await self.click_target(element, delay=(1, 2))
+                            await self.pause(random.uniform(2, 4))
+
                             # Verificar CAPTCHA después de cada activación
                             if await self.detect_captcha():
                                 return
                             break
                 except Exception:
                     continue
-            
+
             # Activar eventos de hover en elementos interactivos
-            interactive_elements = await self.page.query_selector_all('a, button, .clickable, [onclick]')
+            index = await self.get_interaction_index()
+            interactive_elements = [target for target in self.interaction_targets(index, 'hoverable')
+                                    if target['visible']]
             for element in random.sample(interactive_elements, min(5, len(interactive_elements))):
                 try:
-                    if await element.is_visible():
-                        await element.hover()
-                        await asyncio.sleep(random.uniform(0.5, 1))
+                    await self.target_locator(element).hover(timeout=self.interaction_action_timeout)
+                    await self.pause(random.uniform(0.5, 1))
                 except Exception:
                     continue
                     
@@ -483,46 +1046,24 @@ class CaptchaCrawler:
         """Interacción estándar con la página"""
         try:
             # Buscar y hacer clic en botones comunes
-            button_selectors = [
-                'button[type="submit"]',
-                'input[type="submit"]',
-                'button:contains("Siguiente")',
-                'button:contains("Next")',
-                'button:contains("Continuar")',
-                'button:contains("Continue")',
-                'button:contains("Ver más")',
-                'button:contains("Load more")',
-                'a:contains("Siguiente")',
-                'a:contains("Next")',
-                '.btn',
-                '.button',
-                '[role="button"]'
-            ]
-            
-            for selector in button_selectors:
+            for rule in range(len(self.interaction_categories['buttons'])):
                 try:
-                    elements = await self.page.query_selector_all(selector)
-                    if elements:
-                        # Hacer clic en el primer botón visible
-                        for element in elements[:3]:  # Máximo 3 botones
-                            if await element.is_visible():
-                                await element.scroll_into_view_if_needed()
-                                await asyncio.sleep(random.uniform(0.5, 1.0))
-                                await element.click()
-                                await asyncio.sleep(random.uniform(1, 2))
-                                
-                                # Verificar si apareció un CAPTCHA después del clic
-                                if await self.detect_captcha():
-                                    return True
-                                break
+                    index = await self.get_interaction_index()
+                    # Hacer clic en el primer botón visible
+                    for element in self.interaction_targets(index, 'buttons', rule)[:3]:  # Máximo 3 botones
+                        if element['visible']:
+                            await self.click_target(element)
+                            await self.pause(random.uniform(1, 2))
+
+                            # Verificar si apareció un CAPTCHA después del clic
+                            if await self.detect_captcha():
+                                return True
+                            break
                 except Exception:
                     continue
             
             # Scroll por la página para cargar contenido dinámico
-            await self.page.evaluate("window.scrollTo(0, document.body.scrollHeight/2)")
-            await asyncio.sleep(1)
-            await self.page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-            await asyncio.sleep(1)
+            await self.scroll_page(step_ratio=1.0, pause=(500, 1000), max_steps=20)
             
             return False
             
@@ -531,23 +1072,23 @@ class CaptchaCrawler:
             return False
     
     async def get_page_links(self, base_url: str) -> List[str]:
-        """Obtener enlaces de la página actual que pertenezcan al mismo dominio"""
+        """Obtener enlaces de la página actual dentro del alcance del crawl"""
         try:
-            links = await self.page.query_selector_all('a[href]')
+            scope = self.get_scope(base_url)
+            # Todos los href ya resueltos a URL absoluta en una sola evaluación
+            hrefs = await self.page.eval_on_selector_all('a[href]', 'links => links.map(link => link.href)')
             valid_links = []
             
-            for link in links:
-                href = await link.get_attribute('href')
-                if href:
-                    full_url = urljoin(self.page.url, href)
-                    
-                    # Filtrar enlaces válidos del mismo dominio
-                    if (self.is_same_domain(full_url, base_url) and 
-                        full_url not in self.visited_urls and
-                        not any(ext in full_url.lower() for ext in ['.pdf', '.jpg', '.png', '.gif', '.zip', '.doc'])):
-                        valid_links.append(full_url)
+            for href in hrefs:
+                full_url = CrawlScope.canonical(href)
+                if full_url in self.visited_urls or full_url in valid_links:
+                    continue
+                if scope.allows(full_url):
+                    valid_links.append(full_url)
+                    if len(valid_links) >= self.max_links_per_page:
+                        break
             
-            return valid_links[:10]  # Limitar a 10 enlaces por página
+            return valid_links
             
         except Exception as e:
             logger.error(f"Error obteniendo enlaces: {e}")
@@ -556,74 +1097,195 @@ class CaptchaCrawler:
     async def start_browser(self):
         """Inicializar el navegador Playwright"""
         try:
-            self.playwright = await async_playwright().start()
+            started = time.perf_counter()
+            profile = get_browser_profile(self.browser_profile)
+            self.playwright = await load_playwright().async_playwright().start()
             
             # Configuración del navegador para simular comportamiento humano
-            self.browser = await self.playwright.chromium.launch(
-                headless=self.headless,
-                args=[
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-features=IsolateOrigins,site-per-process',
-                    '--disable-site-isolation-trials',
-                    '--disable-web-security',
-                    '--disable-dev-shm-usage',
-                    '--no-sandbox',
-                    '--disable-gpu'
-                ]
-            )
+            self.browser = await launch_browser(self.playwright, profile, self.headless, self.browser_executable)
             
             # Crear contexto con configuración realista
-            self.context = await self.browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                locale='es-ES',
-                timezone_id='Europe/Madrid',
-                geolocation={'latitude': 40.4168, 'longitude': -3.7038},  # Madrid
-                permissions=['geolocation']
-            )
-            
-            # Configurar headers adicionales
-            await self.context.set_extra_http_headers({
-                'Accept-Language': 'es-ES,es;q=0.9,en;q=0.8',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'DNT': '1',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1'
-            })
-            
-            self.page = await self.context.new_page()
-            
-            # Inyectar script para ocultar automatización
-            await self.page.add_init_script("""
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined,
-                });
-                
-                Object.defineProperty(navigator, 'plugins', {
-                    get: () => [1, 2, 3, 4, 5],
-                });
-                
-                Object.defineProperty(navigator, 'languages', {
-                    get: () => ['es-ES', 'es', 'en'],
-                });
-                
-                window.chrome = {
-                    runtime: {},
-                };
-            """)
+            await self.attach_context(await create_context(self.browser, profile))
             
-            logger.info("Navegador iniciado correctamente")
+            self.timings['browser_start'] = round(time.perf_counter() - started, 3)
+            logger.info(f"Navegador iniciado correctamente en {self.timings['browser_start']}s "
+                        f"(perfil {profile['name']})")
             
         except Exception as e:
             logger.error(f"Error iniciando navegador: {e}")
             raise
     
+    async def attach_context(self, context, browser=None):
+        """Preparar un contexto ya creado para el crawl y abrir la página principal.
+
+        Si se pasa browser, navegador y contexto pertenecen a otro (el pool del servicio)
+        y close_browser no los cierra.
+        """
+        started = time.perf_counter()
+        if browser is not None:
+            self.browser = browser
+            self._owns_browser = False
+        self.context = context
+        
+        # Modo --profile: la traza se graba por fragmentos, uno por página seleccionada
+        if self.profiler and self.profiler.trace_pages:
+            await self.context.tracing.start(screenshots=True, snapshots=True)
+        
+        # Modo replay: todas las peticiones se sirven desde el archivo, sin red
+        if self.replay_archive:
+            await self.context.route('**/*', self.replay_archive.handle_route)
+            logger.info(f"Modo replay activo desde {self.replay_archive.root}")
+        
+        # Seguir las navegaciones de cada frame para invalidar sus veredictos cacheados
+        self.context.on('page', self._watch_frames)
+        self.context.on('request', self._track_request)
+        
+        # Modo captura: acumular respuestas por página hasta la siguiente instantánea
+        if self.capture_archive:
+            self.context.on('response', self._track_response)
+        
+        self.page = await self.context.new_page()
+        self.timings['browser_start'] = round(time.perf_counter() - started, 3)
+        self.browser_pid = await self._resolve_browser_pid()
+        self._resource_baseline = await self.process_usage()
+    
+    def _watch_frames(self, page):
+        """Registrar los eventos de navegación y desconexión de frames de una página"""
+        page.on('framenavigated', self._on_frame_navigated)
+        page.on('framedetached', lambda frame: self._frame_navigation_ids.pop(frame, None))
+        page.on('close', lambda closed_page: self._page_requests.pop(closed_page, None))
+
+    def _on_frame_navigated(self, frame):
+        """Asignar un nuevo id de navegación al frame"""
+        self._navigation_counter += 1
+        self._frame_navigation_ids[frame] = self._navigation_counter
+        if frame.parent_frame is None:
+            # Nueva página en el frame principal: la evidencia de red anterior ya no aplica
+            self._page_requests.pop(frame.page, None)
+
+    def _track_request(self, request):
+        """Registrar las URLs pedidas por cada página como evidencia de red"""
+        try:
+            page = request.frame.page
+        except Exception:
+            return
+        if page not in self._page_requests:
+            self._page_requests[page] = deque(maxlen=500)
+        self._page_requests[page].append(request.url)
+
+    def emit_event(self, event: str, data: Dict[str, Any]):
+        """Notificar un evento del crawl ('page', 'detection') al oyente registrado"""
+        if self.event_listener:
+            try:
+                self.event_listener(event, data)
+            except Exception as e:
+                logger.warning(f"Error notificando evento {event}: {e}")
+
+    def record_navigation(self, seconds: float, timed_out: bool = False):
+        """Informar al monitor de carga de la duración de una navegación"""
+        if self.load_monitor:
+            self.load_monitor.record_navigation(seconds, timed_out)
+
+    async def _resolve_browser_pid(self) -> Optional[int]:
+        """PID del proceso principal de Chromium (CDP SystemInfo.getProcessInfo).
+
+        Varios navegadores comparten el proceso de Python en lotes y en el servicio: medir
+        desde este PID separa el consumo de cada crawler.
+        """
+        try:
+            session = await self.browser.new_browser_cdp_session()
+            try:
+                info = await session.send('SystemInfo.getProcessInfo')
+            finally:
+                await session.detach()
+        except Exception as e:
+            logger.debug(f"No se pudo obtener el PID del navegador, sin medición de recursos: {e}")
+            return None
+        for process in info.get('processInfo', []):
+            if process.get('type') == 'browser':
+                return process.get('id')
+        return None
+
+    async def process_usage(self) -> Optional[Dict[str, float]]:
+        """RSS y CPU del árbol de procesos de este navegador, leídos de /proc fuera del bucle"""
+        if not self.browser_pid:
+            return None
+        return await asyncio.get_event_loop().run_in_executor(None, process_tree_usage, self.browser_pid, True)
+
+    async def sample_resources(self, force: bool = False):
+        """Tomar una muestra de RSS y CPU del navegador (como mucho una cada resource_sample_interval)"""
+        now = time.monotonic()
+        if not force and now - self._last_resource_sample < self.resource_sample_interval:
+            return
+        self._last_resource_sample = now
+        usage = await self.process_usage()
+        if usage:
+            self.resource_samples.append(usage)
+
+    def random_viewport_point(self, margin: int = 100) -> tuple:
+        """Punto aleatorio dentro de la ventana actual"""
+        viewport = self.page.viewport_size or {'width': 1920, 'height': 1080}
+        x = random.randint(margin, max(margin, viewport['width'] - margin))
+        y = random.randint(margin, max(margin, viewport['height'] - margin))
+        return x, y
+
+    def _track_response(self, response):
+        """Registrar una respuesta pendiente de archivar para su página"""
+        try:
+            page = response.frame.page
+        except Exception:
+            return
+        self._pending_responses.setdefault(page, []).append(response)
+
+    async def capture_page_snapshot(self, stage: str, page: Optional['Page'] = None):
+        """Guardar el DOM final y las respuestas de la página en el archivo de capturas"""
+        if not self.capture_archive:
+            return
+        page = page or self.page
+        responses = self._pending_responses.pop(page, [])
+        try:
+            # Los iframes se archivan también: la re-evaluación puntúa cada frame como la detección en vivo
+            child_frames = [frame for frame in page.frames
+                            if frame is not page.main_frame and frame.url not in ('', 'about:blank')]
+            contents = await asyncio.gather(*(frame.content() for frame in child_frames), return_exceptions=True)
+            frames = [{'url': frame.url, 'dom': content} for frame, content in zip(child_frames, contents)
+                      if not isinstance(content, BaseException)]
+            await self.capture_archive.record_page(
+                page.url, stage, await page.content(), await page.title(), responses, frames
+            )
+        except Exception as e:
+            logger.warning(f"Error guardando captura de {page.url}: {e}")
+
+    async def start_page_trace(self, url: str):
+        """Empezar la traza de Playwright de una página si el profiler la ha seleccionado"""
+        if not self.profiler or self._trace_path or not self.profiler.should_trace():
+            return
+        self._trace_path = self.profiler.next_trace_path()
+        try:
+            await self.context.tracing.start_chunk(title=url)
+        except Exception as e:
+            logger.warning(f"Error iniciando traza de {url}: {e}")
+            self._trace_path = None
+
+    async def stop_page_trace(self):
+        """Guardar la traza de la página en curso, si hay una abierta"""
+        if not self._trace_path:
+            return
+        path, self._trace_path = self._trace_path, None
+        try:
+            await self.context.tracing.stop_chunk(path=path)
+            logger.info(f"Traza guardada en {path}")
+        except Exception as e:
+            logger.warning(f"Error guardando traza {path}: {e}")
+
     async def close_browser(self):
         """Cerrar el navegador"""
         try:
             if self.page:
                 await self.page.close()
+            if not self._owns_browser:
+                # El contexto y el navegador son del pool, que los reinicia entre trabajos
+                return
             if self.context:
                 await self.context.close()
             if self.browser:
@@ -634,35 +1296,125 @@ class CaptchaCrawler:
         except Exception as e:
             logger.error(f"Error cerrando navegador: {e}")
     
-    async def detect_captcha(self, page_content: str = None) -> bool:
-        """Detectar si hay un CAPTCHA en la página"""
+    async def _detect_in_frame(self, frame, page_content: str = None) -> Dict[str, Any]:
+        """Recoger la evidencia de firmas de un frame con una sola evaluación"""
+        info = await frame.evaluate(FRAME_SIGNATURE_SCRIPT, {
+            'selectors': self.signature_model.dom_selectors(),
+            'maxText': self.max_frame_text
+        })
+        text = page_content if page_content else info['text']
+        locations = {}
+        for selector, src in info['srcs'].items():
+            locations[selector] = urljoin(frame.url, src)
+        return {
+            'matched': self.signature_model.match_frame(text, info['selectors'], info['scripts']),
+            'frame_url': frame.url,
+            'locations': locations
+        }
+
+    async def _detect_in_child_frame(self, frame) -> Dict[str, Any]:
+        """Evidencia de un iframe, reutilizando la anterior si no ha navegado desde el último análisis"""
+        key = (frame.url, self._frame_navigation_ids.get(frame, 0))
+        if key in self._frame_verdicts:
+            return self._frame_verdicts[key]
+        evidence = await self._detect_in_frame(frame)
+        if len(self._frame_verdicts) >= self.frame_verdict_cache_size:
+            self._frame_verdicts.clear()
+        self._frame_verdicts[key] = evidence
+        return evidence
+
+    async def detect_captcha(self, page_content: str = None, page: Optional['Page'] = None) -> bool:
+        """Detectar si hay un CAPTCHA en la página o en cualquiera de sus frames.
+
+        Combina la evidencia de texto, DOM, scripts y red de todos los frames y solo
+        devuelve True si la confianza de algún proveedor supera su umbral.
+        """
+        page = page or self.page
         try:
-            if not page_content:
-                page_content = await self.page.content()
-            
-            # Buscar patrones de texto
-            content_lower = page_content.lower()
-            for pattern in self.captcha_patterns:
-                if re.search(pattern, content_lower, re.IGNORECASE):
-                    logger.info(f"CAPTCHA detectado por patrón: {pattern}")
-                    return True
+            # El frame principal se analiza siempre (su DOM cambia con las interacciones);
+            # los iframes se analizan en paralelo y con caché por navegación
+            child_frames = [frame for frame in page.frames
+                            if frame is not page.main_frame and frame.url not in ('', 'about:blank')]
+            frames_evidence = await asyncio.gather(
+                self._detect_in_frame(page.main_frame, page_content),
+                *(self._detect_in_child_frame(frame) for frame in child_frames),
+                return_exceptions=True
+            )
+            if isinstance(frames_evidence[0], BaseException):
+                logger.error(f"Error detectando CAPTCHA: {frames_evidence[0]}")
             
-            # Buscar elementos de CAPTCHA
-            for selector in self.captcha_selectors:
-                try:
-                    element = await self.page.query_selector(selector)
-                    if element:
-                        logger.info(f"CAPTCHA detectado por selector: {selector}")
-                        return True
-                except:
+            matched = []
+            signature_frames = {}
+            for evidence in frames_evidence:
+                if isinstance(evidence, BaseException):
                     continue
+                for signature_id in evidence['matched']:
+                    matched.append(signature_id)
+                    selector = self.signature_model.signatures[signature_id]['match']
+                    signature_frames.setdefault(
+                        signature_id, evidence['locations'].get(selector, evidence['frame_url'])
+                    )
+            for signature_id in self.signature_model.match_network(self._page_requests.get(page, ())):
+                matched.append(signature_id)
+                signature_frames.setdefault(signature_id, page.url)
+            
+            verdict = self.signature_model.verdict(matched)
+            if verdict is None:
+                weak = self.signature_model.best_score(matched)
+                if weak:
+                    logger.debug(f"Posible CAPTCHA {weak['provider']} ignorado: confianza {weak['confidence']}")
+                return False
             
-            return False
+            verdict['frame_url'] = signature_frames[verdict.pop('signature_id')]
+            logger.info(f"CAPTCHA {verdict['provider']} detectado (confianza {verdict['confidence']}) "
+                        f"por {verdict['signature']} en frame {verdict['frame_url']}")
+            self.last_detection = verdict
+            return True
             
         except Exception as e:
             logger.error(f"Error detectando CAPTCHA: {e}")
             return False
     
+    async def record_detection(self, url: str, page: Optional['Page'] = None):
+        """Registrar la última detección como evento del crawl y guardar su evidencia"""
+        detection = dict(self.last_detection or {})
+        detection.pop('evidence', None)
+        detection['url'] = url
+        detection['timestamp'] = datetime.now().isoformat()
+        self.detections.append(detection)
+        self.emit_event('detection', detection)
+        await self.capture_evidence(url, page)
+
+    async def capture_evidence(self, url: str, page: Optional['Page'] = None):
+        """Tomar captura y DOM de la detección y delegar su codificación al pool de hilos"""
+        if not self.evidence_store:
+            return
+        page = page or self.page
+        detection = self.last_detection or {}
+        try:
+            screenshot = await page.screenshot(type='png', full_page=False)
+            dom = await page.content()
+        except Exception as e:
+            logger.warning(f"Error capturando evidencia en {url}: {e}")
+            return
+
+        future = self.evidence_store.submit({
+            'site': urlparse(url).netloc,
+            'url': url,
+            'page_url': page.url,
+            'frame_url': detection.get('frame_url', page.url),
+            'signature': detection.get('signature'),
+            'provider': detection.get('provider'),
+            'confidence': detection.get('confidence'),
+            'evidence': detection.get('evidence', [])
+        }, screenshot=screenshot, dom=dom)
+        self._evidence_futures.add(future)
+        future.add_done_callback(self._evidence_futures.discard)
+        future.add_done_callback(
+            lambda f: self.evidence_records.append(f.result())
+            if not f.cancelled() and f.exception() is None else None
+        )
+
     async def handle_captcha(self, url: str) -> bool:
         """Intentar superar el CAPTCHA detectado"""
         try:
@@ -682,7 +1434,7 @@ class CaptchaCrawler:
                         checkbox = await frame.query_selector('.recaptcha-checkbox-border')
                         if checkbox:
                             await checkbox.click()
-                            await asyncio.sleep(random.uniform(2, 4))
+                            await self.pause(random.uniform(2, 4))
                             logger.info("Checkbox de reCAPTCHA clickeado")
                 except Exception as e:
                     logger.warning(f"Error con reCAPTCHA: {e}")
@@ -692,23 +1444,23 @@ class CaptchaCrawler:
             if hcaptcha_element:
                 logger.info("hCaptcha detectado - requiere intervención manual")
                 # hCaptcha es más difícil de automatizar
-                await asyncio.sleep(5)
+                await self.pause(5)
             
             # Estrategia 4: Cloudflare challenge
             cf_challenge = await self.page.query_selector('.cf-challenge-form')
             if cf_challenge:
                 logger.info("Cloudflare challenge detectado")
                 # Esperar a que Cloudflare complete automáticamente
-                await asyncio.sleep(10)
+                await self.pause(10)
                 
                 # Buscar botón de verificación
                 verify_button = await self.page.query_selector('input[type="submit"]')
                 if verify_button:
                     await verify_button.click()
-                    await asyncio.sleep(5)
+                    await self.pause(5)
             
             # Verificar si el CAPTCHA fue superado
-            await asyncio.sleep(3)
+            await self.pause(3)
             if not await self.detect_captcha():
                 self.captcha_solved = True
                 # Obtener título de la página
@@ -716,7 +1468,7 @@ class CaptchaCrawler:
                     page_title = await self.page.title()
                     if not page_title:
                         page_title = "Página sin título"
-                except:
+                except Exception:
                     page_title = "Título no disponible"
                 
                 # Crear recuadro visual de éxito
@@ -752,88 +1504,127 @@ class CaptchaCrawler:
         try:
             # Movimientos de mouse aleatorios
             for _ in range(random.randint(2, 5)):
-                x = random.randint(100, 1800)
-                y = random.randint(100, 1000)
+                x, y = self.random_viewport_point()
                 await self.page.mouse.move(x, y)
-                await asyncio.sleep(random.uniform(0.1, 0.3))
+                await self.pause(random.uniform(0.1, 0.3))
             
             # Scroll aleatorio
             scroll_amount = random.randint(-500, 500)
             await self.page.mouse.wheel(0, scroll_amount)
-            await asyncio.sleep(random.uniform(0.5, 1.5))
+            await self.pause(random.uniform(0.5, 1.5))
             
             # Pausa realista
-            await asyncio.sleep(random.uniform(1, 3))
+            await self.pause(random.uniform(1, 3))
             
             logger.debug("Comportamiento humano simulado")
             
         except Exception as e:
             logger.error(f"Error simulando comportamiento humano: {e}")
     
-    async def navigate_to_url(self, url: str, max_retries: int = 3) -> bool:
-        """Navegar a una URL con manejo de CAPTCHAs"""
-        for attempt in range(max_retries):
-            try:
-                logger.info(f"Navegando a {url} (intento {attempt + 1}/{max_retries})")
-                
-                # Simular comportamiento humano antes de navegar
-                if attempt > 0:
-                    await self.simulate_human_behavior()
-                
-                # Navegar a la URL
-                response = await self.page.goto(
-                    url,
-                    wait_until="domcontentloaded",
-                    timeout=self.timeout
-                )
-                
-                if not response:
-                    logger.warning(f"No se recibió respuesta para {url}")
-                    continue
-                
-                logger.info(f"Respuesta recibida: {response.status}")
-                
-                # Esperar a que la página se cargue
-                await self.page.wait_for_load_state("load", timeout=self.timeout)
-                
-                # Detectar y manejar CAPTCHA
-                if await self.detect_captcha():
-                    logger.warning(f"CAPTCHA detectado en {url}")
-                    if await self.handle_captcha(url):
-                        logger.info("CAPTCHA superado, continuando")
-                    else:
-                        logger.error("No se pudo superar el CAPTCHA")
-                        if attempt < max_retries - 1:
-                            await asyncio.sleep(random.uniform(5, 10))
-                            continue
-                        return False
-                
-                # Verificar si la página se cargó correctamente
-                page_content = await self.page.content()
-                if len(page_content) < 100:
-                    logger.warning("Página parece estar vacía o bloqueada")
-                    continue
-                
-                # Simular lectura de la página
-                await asyncio.sleep(random.uniform(2, 5))
-                
-                self.visited_urls.add(url)
-                logger.info(f"Navegación exitosa a {url}")
+    async def navigate_to_url(self, url: str, max_retries: Optional[int] = None) -> bool:
+        """Navegar a una URL con manejo de CAPTCHAs.
+
+        Cada fallo se clasifica (ver retry_policy): los permanentes no se reintentan y
+        los transitorios se reintentan con backoff mientras el presupuesto del sitio y
+        el circuito del host lo permitan.
+        """
+        retry = self.get_retry_policy()
+        max_attempts = max_retries or retry.max_attempts
+        for attempt in range(max_attempts):
+            if not retry.allow(url):
+                logger.warning(f"Circuito abierto para {retry.host(url)}: se omite {url}")
+                return False
+            logger.info(f"Navegando a {url} (intento {attempt + 1}/{max_attempts})")
+            failure = await self._navigation_attempt(url, attempt)
+            if failure is None:
+                retry.record_success(url)
                 return True
-                
-            except PlaywrightTimeoutError:
-                logger.warning(f"Timeout navegando a {url} (intento {attempt + 1})")
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(random.uniform(3, 7))
-                    continue
-            except Exception as e:
-                logger.error(f"Error navegando a {url}: {e}")
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(random.uniform(2, 5))
-                    continue
-        
-        logger.error(f"Falló la navegación a {url} después de {max_retries} intentos")
+
+            # Las respuestas de un intento fallido no pertenecen a la captura de la página siguiente
+            self._pending_responses.pop(self.page, None)
+            kind, reason = failure
+            retry.record_failure(url, kind, reason)
+            if not retry.should_retry(url, kind, attempt, max_attempts):
+                if kind != TRANSIENT:
+                    logger.error(f"Fallo permanente navegando a {url} ({reason}), no se reintenta")
+                break
+            delay = retry.backoff(attempt)
+            logger.info(f"Reintentando {url} en {delay:.1f}s ({reason})")
+            await self.pause(delay)
+
+        logger.error(f"Falló la navegación a {url} después de {attempt + 1} intentos")
         return False
+
+    async def _navigation_attempt(self, url: str, attempt: int) -> Optional[tuple]:
+        """Un intento de navegación: None si tuvo éxito o el fallo clasificado (tipo, motivo)"""
+        PlaywrightTimeoutError = load_playwright().TimeoutError
+        navigation_started = None
+        try:
+            # Simular comportamiento humano antes de navegar
+            if attempt > 0:
+                await self.simulate_human_behavior()
+            
+            # Navegar a la URL
+            navigation_started = time.perf_counter()
+            response = await self.page.goto(
+                url,
+                wait_until="domcontentloaded",
+                timeout=self.timeout
+            )
+            self.invalidate_interaction_index()
+            if 'first_navigation' not in self.timings:
+                self.timings['first_navigation'] = round(time.perf_counter() - self.started_at, 3)
+                logger.info(f"Primera navegación {self.timings['first_navigation']}s después del arranque")
+            
+            if not response:
+                logger.warning(f"No se recibió respuesta para {url}")
+                return TRANSIENT, 'no_response'
+            
+            logger.info(f"Respuesta recibida: {response.status}")
+            
+            # Esperar a que la página se cargue
+            await self.page.wait_for_load_state("load", timeout=self.timeout)
+            self.record_navigation(time.perf_counter() - navigation_started)
+            
+            # Detectar y manejar CAPTCHA (antes del código HTTP: los desafíos suelen llegar con 403/503)
+            if await self.detect_captcha():
+                logger.warning(f"CAPTCHA detectado en {url}")
+                await self.record_detection(url)
+                if await self.handle_captcha(url):
+                    logger.info("CAPTCHA superado, continuando")
+                else:
+                    logger.error("No se pudo superar el CAPTCHA")
+                    return TRANSIENT, 'captcha'
+            
+            # Verificar si la página se cargó correctamente
+            page_content = await self.page.content()
+            if len(page_content) < 100:
+                logger.warning("Página parece estar vacía o bloqueada")
+                return TRANSIENT, 'empty_page'
+            status_failure = classify_status(response.status)
+            if status_failure:
+                logger.warning(f"Error del servidor {response.status} en {url}")
+                return status_failure
+            
+            # Simular lectura de la página
+            await self.pause(random.uniform(2, 5))
+            
+            self.visited_urls.add(url)
+            self.page_visits.append({'url': url, 'timestamp': datetime.now().isoformat()})
+            self.emit_event('page', self.page_visits[-1])
+            await self.sample_resources()
+            await self.capture_page_snapshot('navigation')
+            logger.info(f"Navegación exitosa a {url}")
+            return None
+            
+        except PlaywrightTimeoutError as e:
+            if navigation_started is not None:
+                self.record_navigation(time.perf_counter() - navigation_started, timed_out=True)
+            logger.warning(f"Timeout navegando a {url} (intento {attempt + 1})")
+            return classify_error(e)
+        except Exception as e:
+            logger.error(f"Error navegando a {url}: {e}")
+            return classify_error(e)
     
     async def extract_page_info(self) -> Dict[str, Any]:
         """Extraer información básica de la página actual"""
@@ -872,9 +1663,48 @@ class CaptchaCrawler:
             logger.error(f"Error extrayendo información de la página: {e}")
             return {'error': str(e)}
     
+    def reset_crawl_state(self):
+        """Vaciar los acumuladores de un crawl anterior para reutilizar el crawler"""
+        self.evidence_records = []
+        self.last_detection = None
+        self.detections = []
+        self.page_visits = []
+        self.scroll_reports = []
+        self.visited_urls = set()
+        self.captcha_found = False
+        self.captcha_solved = False
+        self.resource_samples = []
+        self._last_resource_sample = 0.0
+
     async def crawl_site_for_captcha(self, start_url: str) -> Dict[str, Any]:
         """Navegar por el sitio automáticamente buscando CAPTCHAs"""
         start_url = self.normalize_url(start_url)
+        self.reset_crawl_state()
+        if self.browser:
+            # El uso de CPU de cada crawl se mide desde su inicio, no desde el arranque del navegador
+            self._resource_baseline = await self.process_usage()
+        self.scope = CrawlScope.from_config(start_url, self.scope_config)
+        self.retry = RetryPolicy(**self.retry_options)
+        # Todos los logs emitidos durante el crawl llevan el sitio como campo de contexto
+        with log_context(site=urlparse(start_url).netloc):
+            result = await self._crawl_site_for_captcha(start_url)
+            await self.stop_page_trace()
+            result['page_visits'] = list(self.page_visits)
+            result['detections'] = list(self.detections)
+            result['scroll_coverage'] = list(self.scroll_reports)
+            result['scope_rejections'] = dict(self.scope.rejections)
+            result['retries'] = self.retry.metrics()
+            if self.browser_pid:
+                await self.sample_resources(force=True)
+            result['resources'] = summarize_usage(self.resource_samples, self._resource_baseline,
+                                                  result['pages_visited'])
+            if self.evidence_store:
+                await self.evidence_store.drain(self._evidence_futures)
+                result['evidence'] = list(self.evidence_records)
+            return result
+
+    async def _crawl_site_for_captcha(self, start_url: str) -> Dict[str, Any]:
+        """Bucle de crawl de un sitio (ver crawl_site_for_captcha)"""
         
         result = {
             'start_url': start_url,
@@ -883,7 +1713,8 @@ class CaptchaCrawler:
             'captcha_found': False,
             'captcha_solved': False,
             'pages_visited': 0,
-            'visited_urls': []
+            'visited_urls': [],
+            'timings': self.timings
         }
         
         try:
@@ -902,8 +1733,15 @@ class CaptchaCrawler:
                 
                 if current_url in self.visited_urls:
                     continue
+                # Las URLs de un host con el circuito abierto se descartan sin navegar
+                if self.retry.state(current_url) == 'open':
+                    logger.info(f"Circuito abierto para {self.retry.host(current_url)}: se descarta {current_url}")
+                    continue
                 
                 print(f"📄 Visitando página {len(self.visited_urls) + 1}: {current_url}")
+                set_log_context(page=current_url)
+                await self.stop_page_trace()
+                await self.start_page_trace(current_url)
                 
                 # Navegar a la URL actual
                 if await self.navigate_to_url(current_url):
@@ -913,6 +1751,7 @@ class CaptchaCrawler:
                     # Verificar si hay CAPTCHA inmediatamente
                     if await self.detect_captcha():
                         print(f"🎯 ¡CAPTCHA encontrado en: {current_url}!")
+                        await self.record_detection(current_url)
                         result['captcha_found'] = True
                         self.captcha_found = True
                         
@@ -930,10 +1769,12 @@ class CaptchaCrawler:
                         
                         # Pasar más tiempo explorando la página actual
                         await self.deep_page_exploration(current_url)
+                        await self.capture_page_snapshot('exploration')
                         
                         # Verificar CAPTCHA después de la exploración profunda
                         if await self.detect_captcha():
                             print(f"🎯 ¡CAPTCHA encontrado durante exploración profunda en: {current_url}!")
+                            await self.record_detection(current_url)
                             result['captcha_found'] = True
                             self.captcha_found = True
                             
@@ -955,7 +1796,7 @@ class CaptchaCrawler:
                         print(f"   ➡️  Encontrados {len(new_links)} enlaces adicionales")
                     
                     # Pausa más larga entre páginas para simular navegación humana
-                    await asyncio.sleep(random.uniform(3, 6))
+                    await self.pause(random.uniform(3, 6))
                 else:
                     print(f"   ❌ Error navegando a: {current_url}")
             
@@ -978,76 +1819,17 @@ class CaptchaCrawler:
         
         return result
     
+    def rescore_archive(self, archive_root: str, workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Re-evaluar un archivo de capturas con las firmas actuales del crawler"""
+        started = time.time()
+        results = rescore_archive(archive_root, self.signature_model, workers)
+        logger.info(f"Archivo {archive_root} re-evaluado: {len(results)} capturas en {time.time() - started:.1f}s")
+        return results
+
     async def crawl_url(self, url: str) -> Dict[str, Any]:
         """Función de compatibilidad - redirige al nuevo método de búsqueda"""
         return await self.crawl_site_for_captcha(url)
 
-async def main():
-    """Función principal para uso desde línea de comandos"""
-    import argparse
-    
-    parser = argparse.ArgumentParser(description='CAPTCHA Crawler - Navegador automático que busca y supera CAPTCHAs')
-    parser.add_argument('url', help='URL inicial para comenzar la búsqueda (acepta example.com o https://example.com)')
-    parser.add_argument('--headless', action='store_true', default=True, help='Ejecutar en modo headless (por defecto)')
-    parser.add_argument('--visible', action='store_true', help='Ejecutar con navegador visible')
-    parser.add_argument('--timeout', type=int, default=30, help='Timeout en segundos (por defecto: 30)')
-    parser.add_argument('--output', help='Archivo para guardar resultados JSON')
-    parser.add_argument('--max-pages', type=int, default=50, help='Máximo número de páginas a visitar (por defecto: 50)')
-    
-    args = parser.parse_args()
-    
-    # Configurar modo headless
-    headless = args.headless and not args.visible
-    
-    crawler = CaptchaCrawler(headless=headless, timeout=args.timeout)
-    crawler.max_pages = args.max_pages
-    
-    try:
-        logger.info(f"Iniciando crawl de {args.url}")
-        result = await crawler.crawl_url(args.url)
-        
-        # Mostrar resultados finales
-        print("\n" + "="*60)
-        print("📊 RESUMEN DE LA BÚSQUEDA DE CAPTCHAS")
-        print("="*60)
-        print(f"🌐 URL inicial: {result['start_url']}")
-        print(f"📄 Páginas visitadas: {result['pages_visited']}")
-        print(f"🎯 CAPTCHA encontrado: {'✅ SÍ' if result['captcha_found'] else '❌ NO'}")
-        print(f"🏆 CAPTCHA superado: {'✅ SÍ' if result['captcha_solved'] else '❌ NO'}")
-        
-        if result['pages_visited'] > 0:
-            print(f"\n📋 URLs visitadas:")
-            for i, url in enumerate(result['visited_urls'][:10], 1):  # Mostrar máximo 10
-                print(f"   {i}. {url}")
-            if len(result['visited_urls']) > 10:
-                print(f"   ... y {len(result['visited_urls']) - 10} más")
-        
-        if 'error' in result:
-            print(f"\n❌ Error: {result['error']}")
-        
-        if result['captcha_solved']:
-            print("\n🎉 ¡OBJETIVO COMPLETADO! El programa encontró y superó un CAPTCHA.")
-        elif result['captcha_found']:
-            print("\n⚠️  Se encontró un CAPTCHA pero no se pudo superar automáticamente.")
-        else:
-            print("\n🔍 No se encontraron CAPTCHAs en las páginas exploradas.")
-            print("💡 Sugerencias:")
-            print("   - Intenta con un sitio diferente")
-            print("   - Algunos CAPTCHAs aparecen solo después de ciertas acciones")
-            print("   - Usa --visible para ver el navegador en acción")
-        
-        # Guardar resultados si se especifica archivo
-        if args.output:
-            with open(args.output, 'w', encoding='utf-8') as f:
-                json.dump(result, f, indent=2, ensure_ascii=False)
-            print(f"\nResultados guardados en: {args.output}")
-        
-    except KeyboardInterrupt:
-        logger.info("Crawl interrumpido por el usuario")
-    except Exception as e:
-        logger.error(f"Error en main: {e}")
-    finally:
-        await crawler.close_browser()
-
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    from cli import run
+    run()
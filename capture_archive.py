@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Archivo de capturas offline para CAPTCHA Crawler by @M4rt1n_0x1337
+
+Guarda las respuestas y el DOM final de cada página visitada en un almacén local
+comprimido y direccionado por contenido, para poder re-evaluar las firmas de
+detección sin volver a navegar por los sitios.
+
+Estructura del directorio:
+    objects/ab/abcdef....gz   Cuerpos y DOMs comprimidos, nombrados por su SHA-256
+    pages.jsonl               Un registro por captura (formato inspirado en HAR)
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from typing import Optional, Dict, List, Any, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Cabeceras que no se pueden reenviar tal cual: el cuerpo almacenado ya está decodificado
+HOP_BY_HOP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+
+class CaptureArchive:
+    """Almacén local de capturas direccionado por contenido.
+
+    Con create=False (replay y re-evaluación) el archivo tiene que existir ya.
+    """
+
+    def __init__(self, root: str, max_body_bytes: int = 5 * 1024 * 1024, create: bool = True):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.index_path = os.path.join(root, 'pages.jsonl')
+        self.max_body_bytes = max_body_bytes
+        self._responses: Optional[Dict[tuple, Dict[str, Any]]] = None
+        if create:
+            os.makedirs(self.objects_dir, exist_ok=True)
+        elif not os.path.isfile(self.index_path):
+            raise FileNotFoundError(f"No hay un archivo de capturas en {root} (falta pages.jsonl)")
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest + '.gz')
+
+    def store_blob(self, data: bytes) -> str:
+        """Guardar un blob comprimido y devolver su hash; los duplicados no se reescriben"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    def load_blob(self, digest: str) -> bytes:
+        """Leer y descomprimir un blob por su hash"""
+        with gzip.open(self._object_path(digest), 'rb') as f:
+            return f.read()
+
+    def append_record(self, record: Dict[str, Any]):
+        """Añadir un registro de página al índice"""
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._responses = None
+
+    def iter_pages(self) -> Iterator[Dict[str, Any]]:
+        """Recorrer los registros de página del archivo"""
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+    async def record_page(self, url: str, stage: str, dom: str, title: str,
+                          responses: List[Any], frames: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """Capturar el DOM, los DOMs de los iframes ({'url', 'dom'}) y las respuestas de una página"""
+        loop = asyncio.get_event_loop()
+
+        async def capture_response(response) -> Dict[str, Any]:
+            entry = {
+                'request': {
+                    'method': response.request.method,
+                    'url': response.url
+                },
+                'response': {
+                    'status': response.status,
+                    'headers': response.headers,
+                    'content': None
+                }
+            }
+            try:
+                if 300 <= response.status < 400:
+                    raise ValueError("Las redirecciones no tienen cuerpo")
+                body = await response.body()
+                if len(body) <= self.max_body_bytes:
+                    digest = await loop.run_in_executor(None, self.store_blob, body)
+                    entry['response']['content'] = {
+                        'size': len(body),
+                        'mimeType': response.headers.get('content-type', ''),
+                        'sha256': digest
+                    }
+            except Exception:
+                pass
+            return entry
+
+        # Los cuerpos se piden a la vez: uno a uno cada página esperaba un viaje al navegador por respuesta
+        entries = list(await asyncio.gather(*(capture_response(response) for response in responses)))
+
+        dom_digest = await loop.run_in_executor(None, self.store_blob, dom.encode('utf-8'))
+        frame_records = []
+        for frame in frames or []:
+            digest = await loop.run_in_executor(None, self.store_blob, frame['dom'].encode('utf-8'))
+            frame_records.append({'url': frame['url'], 'dom': digest})
+        record = {
+            'url': url,
+            'stage': stage,
+            'title': title,
+            'timestamp': datetime.now().isoformat(),
+            'dom': dom_digest,
+            'frames': frame_records,
+            'entries': entries
+        }
+        await loop.run_in_executor(None, self.append_record, record)
+        logger.debug(f"Captura guardada: {url} ({stage}, {len(entries)} respuestas)")
+        return record
+
+    def _response_map(self) -> Dict[tuple, Dict[str, Any]]:
+        """Índice (método, URL) -> respuesta; la captura más reciente tiene prioridad"""
+        if self._responses is None:
+            self._responses = {}
+            for page in self.iter_pages():
+                for entry in page['entries']:
+                    key = (entry['request']['method'], entry['request']['url'].split('#')[0])
+                    self._responses[key] = entry['response']
+        return self._responses
+
+    def lookup_response(self, method: str, url: str) -> Optional[Dict[str, Any]]:
+        """Buscar la respuesta archivada para una petición"""
+        return self._response_map().get((method, url.split('#')[0]))
+
+    async def handle_route(self, route):
+        """Servir peticiones de Playwright desde el archivo, sin acceso a la red"""
+        request = route.request
+        response = self.lookup_response(request.method, request.url)
+        if response is None:
+            await route.abort('internetdisconnected')
+            return
+
+        headers = {name: value for name, value in response['headers'].items()
+                   if name.lower() not in HOP_BY_HOP_HEADERS}
+        body = b''
+        if response['content']:
+            body = self.load_blob(response['content']['sha256'])
+        await route.fulfill(status=response['status'], headers=headers, body=body)
+
+
+# Extracción aproximada sin navegador, para cuando BeautifulSoup no está instalado
+_SCRIPT_SRC_RE = re.compile(r'<script[^>]+src=["\']([^"\']+)', re.IGNORECASE)
+_INVISIBLE_RE = re.compile(r'<(script|style|noscript|template)[^>]*>.*?</\1>', re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r'<[^>]+>')
+
+
+def match_dom(dom: str, model) -> List[str]:
+    """Firmas de texto, selectores y scripts que coinciden en el DOM de un frame"""
+    try:
+        from bs4 import BeautifulSoup
+    except ImportError:
+        BeautifulSoup = None
+
+    if BeautifulSoup is not None:
+        soup = BeautifulSoup(dom, 'lxml')
+        scripts = [script.get('src') for script in soup.select('script[src]')]
+        selectors = []
+        for selector in model.dom_selectors():
+            try:
+                if soup.select_one(selector) is not None:
+                    selectors.append(selector)
+            except Exception:
+                continue
+        for element in soup(['script', 'style', 'noscript', 'template']):
+            element.decompose()
+        text = soup.get_text(' ')
+    else:
+        scripts = _SCRIPT_SRC_RE.findall(dom)
+        selectors = []
+        text = _TAG_RE.sub(' ', _INVISIBLE_RE.sub(' ', dom))
+
+    return model.match_frame(text, selectors, scripts)
+
+
+def rescore_record(record: Dict[str, Any], archive_root: str, model) -> Dict[str, Any]:
+    """Puntuar las firmas sobre los DOMs archivados (página e iframes) y las URLs que pidió la página.
+
+    Como en la detección en vivo, las coincidencias de todos los frames se combinan antes del veredicto.
+    """
+    archive = CaptureArchive(archive_root, create=False)
+    matched = []
+    for digest in [record['dom']] + [frame['dom'] for frame in record.get('frames', [])]:
+        matched += match_dom(archive.load_blob(digest).decode('utf-8', errors='replace'), model)
+    matched += model.match_network(entry['request']['url'] for entry in record['entries'])
+    verdict = model.verdict(matched)
+    best = verdict or model.best_score(matched) or {}
+
+    return {
+        'url': record['url'],
+        'stage': record['stage'],
+        'timestamp': record['timestamp'],
+        'captcha_found': verdict is not None,
+        'provider': best.get('provider'),
+        'confidence': best.get('confidence', 0.0),
+        'matched': verdict['signature'] if verdict else None
+    }
+
+
+def rescore_archive(archive_root: str, model, workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Re-evaluar todo el archivo con el modelo de firmas actual, en paralelo y sin red"""
+    from concurrent.futures import ProcessPoolExecutor
+
+    records = list(CaptureArchive(archive_root, create=False).iter_pages())
+    if not records:
+        return []
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(rescore_record, record, archive_root, model) for record in records]
+        return [future.result() for future in futures]
@@ -0,0 +1,557 @@
+#!/usr/bin/env python3
+"""
+CLI de CAPTCHA Crawler by @M4rt1n_0x1337
+
+Envoltorio fino sobre la librería captcha_crawler: analiza argumentos, configura
+logging y ejecuta el crawl. Los módulos pesados se importan después de analizar
+los argumentos, así que `--help` responde sin cargarlos.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import sys
+import time
+from typing import Optional
+
+logger = logging.getLogger('captcha_crawler')
+
+
+def process_age() -> Optional[float]:
+    """Segundos transcurridos desde que el sistema lanzó este proceso (solo Linux)"""
+    try:
+        with open('/proc/self/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - int(fields[19]) / os.sysconf('SC_CLK_TCK'))
+    except Exception:
+        return None
+
+
+# Instante (perf_counter) en que se lanzó el proceso, para medir arranque -> primera navegación
+PROCESS_STARTED_AT = time.perf_counter() - (process_age() or 0.0)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Definir los argumentos de línea de comandos"""
+    parser = argparse.ArgumentParser(description='CAPTCHA Crawler - Navegador automático que busca y supera CAPTCHAs')
+    parser.add_argument('url', nargs='*', help='URL inicial para comenzar la búsqueda (acepta example.com o https://example.com); '
+                                               'con varias se crawlean en lote')
+    parser.add_argument('--urls-file', metavar='FILE', help='Fichero con una URL por línea para crawlear en lote')
+    parser.add_argument('--sites', type=int, default=1, metavar='N', help='Sitios del lote en paralelo como máximo (por defecto: 1)')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Ajustar sitios y pestañas activos según CPU, memoria, latencia y timeouts (AIMD)')
+    parser.add_argument('--prescreen', action='store_true',
+                        help='Resolver y sondear los hosts del lote antes de lanzar navegadores; '
+                             'solo se crawlean los destinos vivos')
+    parser.add_argument('--prescreen-concurrency', type=int, default=100, metavar='N',
+                        help='Sondeos de cribado simultáneos (por defecto: 100)')
+    parser.add_argument('--prescreen-timeout', type=float, default=5.0, metavar='SECONDS',
+                        help='Timeout de DNS y de cada sondeo de cribado (por defecto: 5)')
+    parser.add_argument('--headless', action='store_true', default=True, help='Ejecutar en modo headless (por defecto)')
+    parser.add_argument('--visible', action='store_true', help='Ejecutar con navegador visible')
+    parser.add_argument('--timeout', type=int, default=30, help='Timeout en segundos (por defecto: 30)')
+    parser.add_argument('--output', help='Archivo para guardar resultados JSON')
+    parser.add_argument('--max-pages', type=int, default=50, help='Máximo número de páginas a visitar (por defecto: 50)')
+    parser.add_argument('--include', action='append', metavar='PATTERN',
+                        help="Solo seguir URLs que cumplan este glob o regex ('re:...'); repetible")
+    parser.add_argument('--exclude', action='append', metavar='PATTERN',
+                        help="No seguir URLs que cumplan este glob o regex ('re:...'); repetible")
+    parser.add_argument('--same-host', action='store_true',
+                        help='Limitarse al host inicial (por defecto se siguen subdominios del mismo dominio)')
+    parser.add_argument('--scope-config', metavar='FILE', help='Reglas de alcance en YAML o JSON')
+    parser.add_argument('--retries', type=int, default=3, metavar='N',
+                        help='Intentos por URL ante fallos transitorios (por defecto: 3)')
+    parser.add_argument('--retry-budget', type=int, default=10, metavar='N',
+                        help='Reintentos totales permitidos por sitio (por defecto: 10)')
+    parser.add_argument('--product-tabs', type=int, default=0, metavar='N',
+                        help='Abrir productos en N pestañas paralelas en segundo plano (por defecto: 0, clic y volver atrás)')
+    parser.add_argument('--browser-profile', choices=['standard', 'lean'], default='standard',
+                        help='Perfil de navegador: standard o lean (menos memoria por crawl)')
+    parser.add_argument('--browser-executable', metavar='PATH',
+                        help='Binario de Chromium alternativo (p. ej. chromium headless-shell)')
+    parser.add_argument('--capture', metavar='DIR', help='Grabar respuestas y DOMs de cada página en un archivo local')
+    parser.add_argument('--replay', metavar='DIR', help='Servir la navegación desde un archivo de capturas, sin red')
+    parser.add_argument('--rescore', metavar='DIR', help='Re-evaluar las firmas sobre los DOMs archivados, sin navegador')
+    parser.add_argument('--evidence', metavar='DIR', help='Guardar captura, DOM y firma de cada detección en DIR')
+    parser.add_argument('--db', metavar='PATH', help='Guardar la ejecución en un almacén SQLite de resultados')
+    parser.add_argument('--workers', type=int, default=None, help='Procesos para --rescore (por defecto: núcleos disponibles)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Perfilar el crawl (CPU de Python, pausas y espera al navegador por método)')
+    parser.add_argument('--profile-dir', default='profiles', metavar='DIR',
+                        help='Directorio de perfiles; cada ejecución crea un subdirectorio (por defecto: profiles)')
+    parser.add_argument('--profile-trace-pages', type=int, default=0, metavar='N',
+                        help='Con --profile, grabar traza de Playwright de las primeras N páginas')
+    parser.add_argument('--log-file', default='captcha_crawler.log', help='Fichero de log (por defecto: captcha_crawler.log)')
+    parser.add_argument('--log-format', choices=['text', 'json'], default='text', help='Formato del log (por defecto: text)')
+    parser.add_argument('--log-max-bytes', type=int, default=0, help='Rotar el log al alcanzar este tamaño en bytes')
+    parser.add_argument('--log-rotate-when', metavar='WHEN', help="Rotar el log por tiempo ('midnight', 'H', ...)")
+    parser.add_argument('--log-backups', type=int, default=5, help='Ficheros de log rotados a conservar (por defecto: 5)')
+    return parser
+
+
+def build_query_parser() -> argparse.ArgumentParser:
+    """Argumentos del subcomando query"""
+    parser = argparse.ArgumentParser(
+        prog='captcha_crawler.py query',
+        description='Consultar el almacén SQLite de resultados de ejecuciones anteriores'
+    )
+    parser.add_argument('--db', required=True, metavar='PATH', help='Almacén SQLite de resultados')
+    parser.add_argument('--domain', help='Filtrar por dominio (host)')
+    parser.add_argument('--provider', help='Filtrar detecciones por proveedor (recaptcha, hcaptcha, ...)')
+    parser.add_argument('--since', help="Desde esta fecha ISO o hace este tiempo ('7d', '24h')")
+    parser.add_argument('--until', help='Hasta esta fecha ISO (excluida)')
+    parser.add_argument('--runs', action='store_true', help='Listar ejecuciones en lugar de detecciones')
+    parser.add_argument('--diff', nargs=2, type=int, metavar=('OLD_RUN', 'NEW_RUN'),
+                        help='Detecciones que aparecen o desaparecen entre dos ejecuciones')
+    parser.add_argument('--limit', type=int, default=100, help='Máximo de filas (por defecto: 100)')
+    parser.add_argument('--json', action='store_true', help='Salida en JSON')
+    return parser
+
+
+def build_serve_parser() -> argparse.ArgumentParser:
+    """Argumentos del subcomando serve"""
+    parser = argparse.ArgumentParser(
+        prog='captcha_crawler.py serve',
+        description='Servicio de crawl con navegadores precalentados y API HTTP local de trabajos'
+    )
+    parser.add_argument('--listen', default='127.0.0.1:8765', metavar='HOST:PORT',
+                        help='Dirección TCP de la API (por defecto: 127.0.0.1:8765)')
+    parser.add_argument('--socket', metavar='PATH', help='Escuchar en un socket Unix en lugar de TCP')
+    parser.add_argument('--pool', type=int, default=2, metavar='N', help='Navegadores precalentados (por defecto: 2)')
+    parser.add_argument('--visible', action='store_true', help='Ejecutar con navegadores visibles')
+    parser.add_argument('--browser-profile', choices=['standard', 'lean'], default='standard',
+                        help='Perfil de navegador: standard o lean (menos memoria por crawl)')
+    parser.add_argument('--browser-executable', metavar='PATH', help='Binario de Chromium alternativo')
+    parser.add_argument('--timeout', type=int, default=30, help='Timeout por defecto en segundos (por defecto: 30)')
+    parser.add_argument('--max-pages', type=int, default=50, help='Páginas por sitio por defecto (por defecto: 50)')
+    parser.add_argument('--product-tabs', type=int, default=0, metavar='N',
+                        help='Pestañas de producto en paralelo por defecto (por defecto: 0)')
+    parser.add_argument('--scope-config', metavar='FILE', help='Reglas de alcance por defecto en YAML o JSON')
+    parser.add_argument('--evidence', metavar='DIR', help='Guardar captura, DOM y firma de cada detección en DIR')
+    parser.add_argument('--db', metavar='PATH', help='Guardar cada sitio crawleado en un almacén SQLite')
+    parser.add_argument('--log-file', default='captcha_crawler.log', help='Fichero de log (por defecto: captcha_crawler.log)')
+    parser.add_argument('--log-format', choices=['text', 'json'], default='text', help='Formato del log (por defecto: text)')
+    return parser
+
+
+async def serve_main(args: argparse.Namespace):
+    """Arrancar el pool de navegadores y servir la API hasta SIGINT/SIGTERM"""
+    from crawl_scope import load_scope_config
+    from service import BrowserPool, CrawlService, serve
+
+    evidence_store = None
+    if args.evidence:
+        from evidence import EvidenceStore
+        evidence_store = EvidenceStore(args.evidence)
+    store = None
+    if args.db:
+        from result_store import ResultStore
+        store = ResultStore(args.db)
+
+    def configure(crawler):
+        crawler.evidence_store = evidence_store
+
+    pool = BrowserPool(args.pool, args.browser_profile, headless=not args.visible,
+                       executable_path=args.browser_executable)
+    service = CrawlService(pool, defaults={
+        'max_pages': args.max_pages,
+        'product_tabs': args.product_tabs,
+        'timeout': args.timeout,
+        'scope': load_scope_config(args.scope_config) if args.scope_config else {}
+    }, configure=configure, store=store)
+    host, _, port = args.listen.rpartition(':')
+    try:
+        await pool.start()
+        print(f"🟢 Servicio listo: {args.pool} navegadores precalentados en "
+              f"{'unix:' + args.socket if args.socket else 'http://' + args.listen}")
+        await serve(service, host or '127.0.0.1', int(port), socket_path=args.socket)
+    finally:
+        await pool.close()
+        if store:
+            store.close()
+        if evidence_store:
+            await evidence_store.close()
+
+
+def run_serve(argv):
+    """Subcomando serve: servicio de larga duración"""
+    args = build_serve_parser().parse_args(argv)
+    from crawler_logging import setup_logging, shutdown_logging
+
+    listener = setup_logging(args.log_file, json_format=args.log_format == 'json')
+    try:
+        asyncio.run(serve_main(args))
+    except (ImportError, ValueError, OSError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        shutdown_logging(listener)
+
+
+def parse_time(value: Optional[str]) -> Optional[str]:
+    """Convertir '7d' / '24h' / '30m' en una fecha ISO relativa a ahora; las fechas ISO pasan tal cual"""
+    if not value:
+        return None
+    from datetime import datetime, timedelta
+    units = {'d': 'days', 'h': 'hours', 'm': 'minutes'}
+    if value[-1] in units and value[:-1].isdigit():
+        return (datetime.now() - timedelta(**{units[value[-1]]: int(value[:-1])})).isoformat()
+    return value
+
+
+def run_query(argv):
+    """Subcomando query: consultas sobre el almacén de resultados"""
+    args = build_query_parser().parse_args(argv)
+    from result_store import ResultStore
+
+    store = ResultStore(args.db)
+    try:
+        started = time.perf_counter()
+        if args.diff:
+            rows = store.diff_runs(*args.diff)
+        elif args.runs:
+            rows = store.find_runs(args.domain, parse_time(args.since), parse_time(args.until), args.limit)
+        else:
+            rows = store.find_detections(args.domain, args.provider, parse_time(args.since),
+                                         parse_time(args.until), args.limit)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+    finally:
+        store.close()
+
+    if args.json:
+        print(json.dumps(rows, indent=2, ensure_ascii=False))
+        return
+
+    if args.diff:
+        for change, symbol in (('added', '+'), ('removed', '-')):
+            for row in rows[change]:
+                print(f"{symbol} {row['provider'] or '-':<11} {row['url']}")
+        print(f"\n{len(rows['added'])} nuevas, {len(rows['removed'])} desaparecidas, "
+              f"{len(rows['unchanged'])} sin cambios ({elapsed_ms:.1f} ms)")
+    elif args.runs:
+        for row in rows:
+            status = '🎯' if row['captcha_found'] else '  '
+            print(f"{row['id']:>6} {row['started_at'][:19]} {status} {row['pages_visited']:>3} págs  {row['start_url']}")
+        print(f"\n{len(rows)} ejecuciones ({elapsed_ms:.1f} ms)")
+    else:
+        for row in rows:
+            confidence = f"{row['confidence']:.2f}" if row['confidence'] is not None else '-'
+            print(f"{row['detected_at'][:19]} {row['provider'] or '-':<11} {confidence} {row['url']}")
+        print(f"\n{len(rows)} detecciones ({elapsed_ms:.1f} ms)")
+
+
+def build_scope_config(args: argparse.Namespace) -> dict:
+    """Combinar el fichero de alcance con las reglas del CLI"""
+    from crawl_scope import load_scope_config
+
+    config = load_scope_config(args.scope_config) if args.scope_config else {}
+    config['include'] = list(config.get('include') or []) + (args.include or [])
+    config['exclude'] = list(config.get('exclude') or []) + (args.exclude or [])
+    if args.same_host:
+        config['allow_subdomains'] = False
+    return config
+
+
+def create_crawler(args: argparse.Namespace, shared: dict):
+    """Crear un crawler configurado según los argumentos.
+
+    shared contiene los objetos comunes a todos los crawlers de la ejecución
+    (almacén de evidencias, profiler, monitor de carga, límite de pestañas).
+    """
+    from captcha_crawler import CaptchaCrawler
+    from capture_archive import CaptureArchive
+
+    # Configurar modo headless
+    headless = args.headless and not args.visible
+
+    crawler = CaptchaCrawler(headless=headless, timeout=args.timeout)
+    crawler.started_at = PROCESS_STARTED_AT
+    crawler.max_pages = args.max_pages
+    crawler.scope_config = shared['scope_config']
+    crawler.retry_options = {'max_attempts': args.retries, 'site_budget': args.retry_budget}
+    crawler.product_tab_fanout = args.product_tabs
+    crawler.browser_profile = args.browser_profile
+    crawler.browser_executable = args.browser_executable
+    if args.capture:
+        crawler.capture_archive = CaptureArchive(args.capture)
+    if args.replay:
+        crawler.replay_archive = CaptureArchive(args.replay, create=False)
+    crawler.evidence_store = shared.get('evidence_store')
+    crawler.load_monitor = shared.get('load_monitor')
+    crawler.page_concurrency = shared.get('page_concurrency')
+    profiler = shared.get('profiler')
+    if profiler:
+        crawler.profiler = profiler
+        profiler.instrument(crawler)
+    return crawler
+
+
+def collect_urls(args: argparse.Namespace) -> list:
+    """URLs de la línea de comandos y de --urls-file, sin duplicados"""
+    urls = list(args.url)
+    if args.urls_file:
+        from batch import read_url_list
+        urls += read_url_list(args.urls_file)
+    return list(dict.fromkeys(urls))
+
+
+def print_summary(result: dict):
+    """Mostrar el resumen de un crawl de un solo sitio"""
+    print("\n" + "="*60)
+    print("📊 RESUMEN DE LA BÚSQUEDA DE CAPTCHAS")
+    print("="*60)
+    print(f"🌐 URL inicial: {result['start_url']}")
+    print(f"📄 Páginas visitadas: {result['pages_visited']}")
+    print(f"🎯 CAPTCHA encontrado: {'✅ SÍ' if result['captcha_found'] else '❌ NO'}")
+    print(f"🏆 CAPTCHA superado: {'✅ SÍ' if result['captcha_solved'] else '❌ NO'}")
+    if 'first_navigation' in result['timings']:
+        print(f"⏱️  Arranque hasta primera navegación: {result['timings']['first_navigation']}s")
+    if result.get('resources'):
+        resources = result['resources']
+        print(f"💾 RSS navegador: medio {resources['rss_mb_avg']} MB, pico {resources['rss_mb_peak']} MB; "
+              f"CPU por página: {resources['cpu_seconds_per_page']}s")
+
+    if result.get('retries'):
+        retries = result['retries']
+        open_hosts = [host for host, state in retries['hosts'].items() if state['state'] != 'closed']
+        print(f"🔁 Reintentos: {retries['retries']}/{retries['site_budget']}"
+              + (f"; circuito abierto: {', '.join(open_hosts)}" if open_hosts else ''))
+
+    if result['pages_visited'] > 0:
+        print(f"\n📋 URLs visitadas:")
+        for i, url in enumerate(result['visited_urls'][:10], 1):  # Mostrar máximo 10
+            print(f"   {i}. {url}")
+        if len(result['visited_urls']) > 10:
+            print(f"   ... y {len(result['visited_urls']) - 10} más")
+
+    if 'error' in result:
+        print(f"\n❌ Error: {result['error']}")
+
+    if result['captcha_solved']:
+        print("\n🎉 ¡OBJETIVO COMPLETADO! El programa encontró y superó un CAPTCHA.")
+    elif result['captcha_found']:
+        print("\n⚠️  Se encontró un CAPTCHA pero no se pudo superar automáticamente.")
+    else:
+        print("\n🔍 No se encontraron CAPTCHAs en las páginas exploradas.")
+        print("💡 Sugerencias:")
+        print("   - Intenta con un sitio diferente")
+        print("   - Algunos CAPTCHAs aparecen solo después de ciertas acciones")
+        print("   - Usa --visible para ver el navegador en acción")
+
+
+def print_concurrency(metrics: dict):
+    """Mostrar el estado final de los controladores de concurrencia"""
+    for controller in metrics.values():
+        print(f"⚖️  Concurrencia de {controller['name']}: límite final {controller['limit']} "
+              f"(rango {controller['minimum']}-{controller['maximum']}, pico {controller['peak_active']}, "
+              f"{controller['increases']} subidas, {controller['decreases']} bajadas)")
+
+
+async def run_single(args: argparse.Namespace, url: str, shared: dict, store) -> dict:
+    """Crawl de un solo sitio con el resumen completo"""
+    crawler = create_crawler(args, shared)
+    profiler = shared.get('profiler')
+    try:
+        logger.info(f"Iniciando crawl de {url}")
+        with profiler.session() if profiler else contextlib.nullcontext():
+            result = await crawler.crawl_url(url)
+        if shared.get('page_concurrency'):
+            result['concurrency'] = {'pages': shared['page_concurrency'].metrics()}
+
+        # Mostrar resultados finales
+        print_summary(result)
+        if result.get('concurrency'):
+            print_concurrency(result['concurrency'])
+        if profiler:
+            print(f"🔬 Perfil guardado en: {profiler.run_dir} (summary.txt, python.pstats)")
+
+        # Guardar en el almacén de resultados
+        if store:
+            run_id = await asyncio.get_event_loop().run_in_executor(None, store.record_run, result)
+            print(f"\nEjecución guardada en {args.db} (id {run_id})")
+        return result
+    finally:
+        await crawler.close_browser()
+
+
+async def run_prescreen(args: argparse.Namespace, urls: list) -> tuple:
+    """Cribar el lote: destinos vivos, resultados de los descartados e informe"""
+    from batch import failed_result
+    from prescreen import prescreen_urls, live_targets, summarize_prescreen
+
+    started = time.perf_counter()
+    entries = await prescreen_urls(urls, args.prescreen_concurrency, args.prescreen_timeout)
+    report = summarize_prescreen(entries, time.perf_counter() - started)
+    targets = live_targets(entries)
+    discarded = []
+    for entry in entries:
+        if entry['status'] == 'dead':
+            result = failed_result(entry['url'], f"prescreen: {entry['reason']}")
+            result['prescreen'] = entry
+            discarded.append(result)
+        elif entry['status'] == 'redirect':
+            print(f"↪️  {entry['url']} -> {entry['target']}")
+    statuses = report['statuses']
+    print(f"🔎 Cribado de {len(entries)} URLs en {report['seconds']}s: {statuses.get('live', 0)} vivas, "
+          f"{statuses.get('redirect', 0)} redirigidas, {statuses.get('unknown', 0)} dudosas, "
+          f"{statuses.get('dead', 0)} descartadas; "
+          f"{len(targets)} destinos a crawlear")
+    if report['reasons']:
+        print("   Motivos: " + ', '.join(f"{reason} {count}" for reason, count in sorted(report['reasons'].items())))
+    return targets, discarded, report
+
+
+async def run_batch(args: argparse.Namespace, urls: list, shared: dict, store) -> dict:
+    """Crawl de varios sitios en paralelo con una línea por sitio"""
+    from batch import crawl_batch
+    from concurrency import AdaptiveConcurrency
+
+    sites = AdaptiveConcurrency('sitios', shared['load_monitor'], minimum=1, maximum=args.sites,
+                                initial=1 if args.adaptive else args.sites, adaptive=args.adaptive)
+    loop = asyncio.get_event_loop()
+    print(f"\n🚀 Lote de {len(urls)} sitios (hasta {args.sites} en paralelo"
+          f"{', adaptativo' if args.adaptive else ''})\n")
+
+    async def on_result(result: dict):
+        status = '🎯' if result['captcha_found'] else ('❌' if result.get('error') else '  ')
+        print(f"{status} {result['pages_visited']:>3} págs  {result['start_url']}"
+              f"{'  (' + result['error'] + ')' if result.get('error') else ''}")
+        if store:
+            await loop.run_in_executor(None, store.record_run, result)
+
+    # Con la red real (no --replay) los hosts muertos se descartan antes de abrir navegadores
+    discarded, prescreen = [], None
+    if args.prescreen and not args.replay:
+        urls, discarded, prescreen = await run_prescreen(args, urls)
+        for result in discarded:
+            await on_result(result)
+
+    profiler = shared.get('profiler')
+    with profiler.session() if profiler else contextlib.nullcontext():
+        results = discarded + await crawl_batch(urls, lambda: create_crawler(args, shared), sites, on_result)
+
+    concurrency = {'sites': sites.metrics()}
+    if shared.get('page_concurrency'):
+        concurrency['pages'] = shared['page_concurrency'].metrics()
+
+    print("\n" + "="*60)
+    print("📊 RESUMEN DEL LOTE")
+    print("="*60)
+    print(f"🌐 Sitios: {len(results)}")
+    print(f"🎯 Con CAPTCHA: {sum(1 for result in results if result['captcha_found'])}")
+    print(f"🏆 CAPTCHA superado: {sum(1 for result in results if result['captcha_solved'])}")
+    print(f"❌ Con error: {sum(1 for result in results if result.get('error'))}")
+    print_concurrency(concurrency)
+    if profiler:
+        print(f"🔬 Perfil guardado en: {profiler.run_dir} (summary.txt, python.pstats)")
+    if store:
+        print(f"\nEjecuciones guardadas en {args.db}")
+    output = {'results': results, 'concurrency': concurrency}
+    if prescreen:
+        output['prescreen'] = prescreen
+    return output
+
+
+async def main(args: argparse.Namespace):
+    """Función principal para uso desde línea de comandos"""
+    shared = {'scope_config': build_scope_config(args)}
+    if args.evidence:
+        from evidence import EvidenceStore
+        shared['evidence_store'] = EvidenceStore(args.evidence)
+
+    if args.rescore:
+        results = create_crawler(args, shared).rescore_archive(args.rescore, workers=args.workers)
+        detections = [item for item in results if item['captcha_found']]
+        print(f"\n📦 Capturas re-evaluadas: {len(results)}")
+        print(f"🎯 Detecciones: {len(detections)}")
+        for item in detections[:20]:
+            print(f"   {item['url']} [{item['stage']}] -> {item['matched']}")
+        if len(detections) > 20:
+            print(f"   ... y {len(detections) - 20} más")
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2, ensure_ascii=False)
+            print(f"\nResultados guardados en: {args.output}")
+        return
+
+    if args.profile:
+        from profiling import CrawlProfiler
+        shared['profiler'] = CrawlProfiler(args.profile_dir, trace_pages=args.profile_trace_pages)
+
+    # Control adaptativo: monitor de carga compartido y límite global de pestañas de producto
+    from concurrency import LoadMonitor, AdaptiveConcurrency
+    shared['load_monitor'] = LoadMonitor()
+    if args.adaptive and args.product_tabs:
+        shared['page_concurrency'] = AdaptiveConcurrency(
+            'pestañas', shared['load_monitor'], minimum=1, maximum=args.product_tabs * args.sites
+        )
+
+    store = None
+    if args.db:
+        from result_store import ResultStore
+        store = ResultStore(args.db)
+
+    urls = collect_urls(args)
+    try:
+        if len(urls) == 1:
+            output = await run_single(args, urls[0], shared, store)
+        else:
+            output = await run_batch(args, urls, shared, store)
+
+        # Guardar resultados si se especifica archivo
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(output, f, indent=2, ensure_ascii=False)
+            print(f"\nResultados guardados en: {args.output}")
+
+    except KeyboardInterrupt:
+        logger.info("Crawl interrumpido por el usuario")
+    except Exception as e:
+        logger.error(f"Error en main: {e}")
+    finally:
+        if store:
+            store.close()
+        if shared.get('evidence_store'):
+            await shared['evidence_store'].close()
+
+
+def run(argv=None):
+    """Punto de entrada del CLI"""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == 'query':
+        run_query(argv[1:])
+        return
+    if argv and argv[0] == 'serve':
+        run_serve(argv[1:])
+        return
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.url and not args.urls_file and not args.rescore:
+        parser.error('se requiere una URL (o --urls-file FILE, o --rescore DIR)')
+
+    from crawler_logging import setup_logging, shutdown_logging
+
+    listener = setup_logging(
+        args.log_file,
+        json_format=args.log_format == 'json',
+        max_bytes=args.log_max_bytes,
+        backup_count=args.log_backups,
+        rotate_when=args.log_rotate_when
+    )
+    try:
+        asyncio.run(main(args))
+    except (ImportError, ValueError, OSError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        shutdown_logging(listener)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Control adaptativo de concurrencia para CAPTCHA Crawler by @M4rt1n_0x1337
+
+Un LoadMonitor reúne las señales de carga del nodo (CPU del sistema y memoria
+disponible, leídas de /proc) y de las navegaciones (percentiles de latencia y
+tasa de timeouts en una ventana temporal). Cada AdaptiveConcurrency limita un
+recurso (sitios o pestañas activas) y ajusta su límite con AIMD:
+
+- Sobrecarga (CPU alta, poca memoria, timeouts o p95 por encima del objetivo):
+  el límite se multiplica por decrease_factor, con un periodo de enfriamiento
+  para que las señales reflejen el cambio antes de volver a reducir.
+- Sin sobrecarga y con demanda (tareas esperando hueco): el límite sube en uno.
+
+Cada decisión queda registrada con sus señales para exponerla en las métricas.
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, List, Any
+
+
+def read_cpu_times() -> Optional[tuple]:
+    """Tiempo total y ocioso de la CPU del sistema en ticks (solo Linux)"""
+    try:
+        with open('/proc/stat') as f:
+            fields = [int(value) for value in f.readline().split()[1:]]
+    except (OSError, ValueError):
+        return None
+    idle = fields[3] + (fields[4] if len(fields) > 4 else 0)  # idle + iowait
+    return sum(fields), idle
+
+
+def read_memory() -> Optional[Dict[str, float]]:
+    """Memoria disponible en MB y como fracción del total (solo Linux)"""
+    try:
+        with open('/proc/meminfo') as f:
+            info = {line.split(':')[0]: int(line.split()[1]) for line in f if ':' in line}
+        total, available = info['MemTotal'], info['MemAvailable']
+    except (OSError, ValueError, KeyError, IndexError):
+        return None
+    return {'available_mb': round(available / 1024, 1), 'available_fraction': round(available / total, 3)}
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Percentil por el método del rango más cercano"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+class LoadMonitor:
+    """Señales de carga compartidas por los controladores de concurrencia"""
+
+    def __init__(self, window_seconds: float = 60.0, max_samples: int = 500, cpu_interval: float = 5.0):
+        self.window_seconds = window_seconds
+        self.cpu_interval = cpu_interval  # Periodo mínimo entre lecturas de /proc/stat
+        self._navigations: deque = deque(maxlen=max_samples)  # (instante, segundos, timeout)
+        self._last_cpu = read_cpu_times()
+        self._last_cpu_at = time.monotonic()
+        self._cpu: Optional[float] = None
+
+    def record_navigation(self, seconds: float, timed_out: bool = False):
+        """Registrar la duración de una navegación y si acabó en timeout"""
+        self._navigations.append((time.monotonic(), seconds, timed_out))
+
+    def _cpu_utilization(self) -> Optional[float]:
+        """CPU del último periodo completo; los controladores que comparten el monitor leen el mismo valor"""
+        now = time.monotonic()
+        if now - self._last_cpu_at < self.cpu_interval:
+            return self._cpu
+        current = read_cpu_times()
+        previous, self._last_cpu, self._last_cpu_at = self._last_cpu, current, now
+        if not current or not previous or current[0] <= previous[0]:
+            self._cpu = None
+        else:
+            self._cpu = round(1.0 - (current[1] - previous[1]) / (current[0] - previous[0]), 3)
+        return self._cpu
+
+    def sample(self) -> Dict[str, Any]:
+        """Señales actuales: CPU desde la muestra anterior, memoria y navegaciones recientes"""
+        cutoff = time.monotonic() - self.window_seconds
+        recent = [(seconds, timed_out) for at, seconds, timed_out in self._navigations if at >= cutoff]
+        latencies = [seconds for seconds, timed_out in recent if not timed_out]
+        p50, p95 = percentile(latencies, 0.5), percentile(latencies, 0.95)
+        signals = {
+            'cpu': self._cpu_utilization(),
+            'navigations': len(recent),
+            'latency_p50': round(p50, 2) if p50 is not None else None,
+            'latency_p95': round(p95, 2) if p95 is not None else None,
+            'timeout_rate': round(sum(1 for _, timed_out in recent if timed_out) / len(recent), 3) if recent else 0.0
+        }
+        signals.update(read_memory() or {'available_mb': None, 'available_fraction': None})
+        return signals
+
+
+class AdaptiveConcurrency:
+    """Límite de concurrencia AIMD: semáforo cuyo tamaño se ajusta en tiempo de ejecución"""
+
+    def __init__(self, name: str, monitor: LoadMonitor, minimum: int = 1, maximum: int = 8,
+                 initial: Optional[int] = None, adaptive: bool = True, interval: float = 5.0,
+                 cooldown: float = 20.0, decrease_factor: float = 0.5, cpu_high: float = 0.85,
+                 memory_low_fraction: float = 0.1, memory_low_mb: float = 768,
+                 latency_p95_target: float = 20.0, timeout_rate_high: float = 0.15,
+                 min_navigations: int = 5, max_decisions: int = 200):
+        self.name = name
+        self.monitor = monitor
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(self.maximum, max(self.minimum, initial or self.minimum))
+        self.adaptive = adaptive
+        self.interval = interval
+        self.cooldown = cooldown
+        self.decrease_factor = decrease_factor
+        self.cpu_high = cpu_high
+        self.memory_low_fraction = memory_low_fraction
+        self.memory_low_mb = memory_low_mb
+        self.latency_p95_target = latency_p95_target
+        self.timeout_rate_high = timeout_rate_high
+        self.min_navigations = min_navigations  # Navegaciones mínimas para fiarse de latencias y timeouts
+        self.active = 0
+        self.peak_active = 0
+        self.decisions: deque = deque(maxlen=max_decisions)
+        self._wakeup = asyncio.Event()
+        self._saturated = False
+        self._last_adjust = time.monotonic()
+        self._last_decrease = float('-inf')
+        self._started = time.monotonic()
+
+    def _overload_reasons(self, signals: Dict[str, Any]) -> List[str]:
+        reasons = []
+        if signals['cpu'] is not None and signals['cpu'] >= self.cpu_high:
+            reasons.append(f"cpu {signals['cpu']:.0%}")
+        if signals['available_fraction'] is not None and (
+                signals['available_fraction'] < self.memory_low_fraction
+                or signals['available_mb'] < self.memory_low_mb):
+            reasons.append(f"memoria libre {signals['available_mb']:.0f} MB")
+        if signals['navigations'] >= self.min_navigations:
+            if signals['timeout_rate'] >= self.timeout_rate_high:
+                reasons.append(f"timeouts {signals['timeout_rate']:.0%}")
+            if signals['latency_p95'] is not None and signals['latency_p95'] > self.latency_p95_target:
+                reasons.append(f"p95 {signals['latency_p95']}s")
+        return reasons
+
+    def _record(self, action: str, previous: int, reason: str, signals: Dict[str, Any]):
+        self.decisions.append({
+            'at': round(time.monotonic() - self._started, 1),
+            'action': action,
+            'limit': self.limit,
+            'previous': previous,
+            'reason': reason,
+            'active': self.active,
+            'signals': signals
+        })
+
+    def adjust(self):
+        """Evaluar las señales y aplicar una decisión AIMD si ha pasado el intervalo"""
+        now = time.monotonic()
+        if not self.adaptive or now - self._last_adjust < self.interval:
+            return
+        self._last_adjust = now
+        signals = self.monitor.sample()
+        reasons = self._overload_reasons(signals)
+        previous = self.limit
+
+        if reasons:
+            if now - self._last_decrease >= self.cooldown and self.limit > self.minimum:
+                self.limit = max(self.minimum, int(self.limit * self.decrease_factor))
+                self._last_decrease = now
+                self._record('decrease', previous, ', '.join(reasons), signals)
+        elif self._saturated and self.limit < self.maximum:
+            self.limit += 1
+            self._record('increase', previous, 'sin sobrecarga y con tareas en espera', signals)
+            self._wakeup.set()
+        self._saturated = False
+
+    async def acquire(self):
+        """Esperar un hueco dentro del límite actual.
+
+        Mientras espera, reevalúa el límite cada intervalo aunque no se libere ningún hueco.
+        """
+        while True:
+            self.adjust()
+            if self.active < self.limit:
+                break
+            self._saturated = True
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        if self.active >= self.limit:
+            self._saturated = True
+
+    def release(self):
+        """Liberar un hueco"""
+        self.active -= 1
+        self.adjust()
+        self._wakeup.set()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Context manager asíncrono que ocupa un hueco mientras dura el bloque"""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Estado y decisiones del controlador para las métricas de la ejecución"""
+        return {
+            'name': self.name,
+            'adaptive': self.adaptive,
+            'limit': self.limit,
+            'minimum': self.minimum,
+            'maximum': self.maximum,
+            'peak_active': self.peak_active,
+            'increases': sum(1 for decision in self.decisions if decision['action'] == 'increase'),
+            'decreases': sum(1 for decision in self.decisions if decision['action'] == 'decrease'),
+            'decisions': list(self.decisions)
+        }
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Alcance del crawl y filtro de URLs para CAPTCHA Crawler by @M4rt1n_0x1337
+
+Decide en una sola pasada por URL (un urlsplit y reglas precompiladas) si un enlace
+merece una navegación:
+
+- Dominio registrable: example.com, www.example.com y shop.example.com son el mismo sitio.
+- Reglas de inclusión/exclusión: globs ('*/blog/*') o regex ('re:/p/\\d+$') desde el CLI
+  o un fichero de configuración YAML/JSON; cada lista se compila en una sola regex.
+- Tipo de recurso: extensión del path (no subcadenas de la URL) y su tipo MIME.
+- Acciones peligrosas: logout, vaciar carrito, darse de baja...
+- Trampas: segmentos de path repetidos, paths demasiado profundos y variantes de query
+  sin límite sobre el mismo path (calendarios, filtros combinatorios).
+"""
+
+import fnmatch
+import json
+import mimetypes
+import posixpath
+import re
+from typing import Optional, Dict, List, Any, Iterable, Set
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Sufijos públicos de varios niveles habituales, para cuando tldextract no está instalado
+MULTI_LABEL_SUFFIXES = {
+    'co.uk', 'org.uk', 'ac.uk', 'gov.uk', 'me.uk', 'ltd.uk', 'plc.uk',
+    'com.ar', 'com.mx', 'com.br', 'com.co', 'com.pe', 'com.ve', 'com.uy', 'com.ec', 'com.bo',
+    'com.py', 'com.do', 'com.gt', 'com.sv', 'com.ni', 'com.pa', 'com.cu', 'gob.mx', 'gob.ar',
+    'gob.es', 'org.es', 'com.es', 'nom.es', 'edu.es',
+    'com.au', 'net.au', 'org.au', 'co.nz', 'co.jp', 'ne.jp', 'or.jp', 'co.kr', 'co.in',
+    'com.cn', 'com.hk', 'com.sg', 'com.tw', 'com.tr', 'co.za', 'com.ua', 'co.il'
+}
+
+# Tipos MIME (deducidos de la extensión) que no son páginas navegables
+BLOCKED_MIME_PREFIXES = ('image/', 'video/', 'audio/', 'font/')
+BLOCKED_MIME_TYPES = {
+    'application/pdf', 'application/zip', 'application/gzip', 'application/x-tar',
+    'application/x-7z-compressed', 'application/vnd.rar', 'application/x-rar-compressed',
+    'application/msword', 'application/vnd.ms-excel', 'application/vnd.ms-powerpoint',
+    'application/octet-stream', 'application/json', 'application/xml', 'text/xml',
+    'application/javascript', 'text/javascript', 'text/css', 'text/csv', 'application/rtf',
+    'application/x-msdownload', 'application/vnd.android.package-archive'
+}
+# Extensiones sin tipo MIME en mimetypes que tampoco son páginas
+BLOCKED_EXTENSIONS = {'.dmg', '.exe', '.msi', '.apk', '.iso', '.rar', '.7z', '.docx', '.xlsx',
+                      '.pptx', '.webp', '.avif', '.woff', '.woff2', '.mjs', '.map'}
+
+# Acciones que cierran la sesión o modifican estado: nunca se navegan
+DEFAULT_EXCLUDES = [
+    r're:/(log-?out|sign-?out|salir|cerrar-?sesion)\b',
+    r're:[?&/](action|accion)=(logout|delete|remove|clear|empty)\b',
+    r're:/(cart|carrito|basket)/(clear|empty|vaciar|remove|delete)',
+    r're:/(unsubscribe|darse-de-baja|baja)\b',
+    r're:/(delete|remove|borrar|eliminar)/'
+]
+
+# Opciones aceptadas en el fichero de configuración (argumentos de CrawlScope)
+SCOPE_OPTIONS = ('include', 'exclude', 'allow_subdomains', 'default_excludes', 'max_depth',
+                 'max_segment_repeats', 'max_query_params', 'max_query_variants', 'blocked_extensions')
+
+
+def registrable_domain(host: str) -> str:
+    """Dominio registrable de un host: www.shop.example.co.uk -> example.co.uk"""
+    host = (host or '').lower().rstrip('.')
+    if not host or re.fullmatch(r'[\d.]+|[0-9a-f]*:[0-9a-f:.]*', host):
+        return host  # IPs y hosts vacíos se comparan tal cual
+    try:
+        import tldextract
+    except ImportError:
+        labels = host.split('.')
+        if len(labels) >= 3 and '.'.join(labels[-2:]) in MULTI_LABEL_SUFFIXES:
+            return '.'.join(labels[-3:])
+        return '.'.join(labels[-2:])
+    # Lista de sufijos incluida en el paquete, sin descargarla
+    extracted = _tld_extractor(tldextract)(host)
+    if not extracted.suffix or not extracted.domain:
+        return host
+    return f"{extracted.domain}.{extracted.suffix}"
+
+
+_extractor = None
+
+
+def _tld_extractor(tldextract):
+    global _extractor
+    if _extractor is None:
+        _extractor = tldextract.TLDExtract(suffix_list_urls=())
+    return _extractor
+
+
+def compile_patterns(patterns: Iterable[str]) -> Optional[re.Pattern]:
+    """Compilar globs y regex ('re:...') en una sola expresión alternada"""
+    parts = []
+    for pattern in patterns:
+        if pattern.startswith('re:'):
+            parts.append(f"(?:{pattern[3:]})")
+        else:
+            # Un glob tiene que cubrir la URL entera
+            parts.append(f"(?:^{fnmatch.translate(pattern)})")
+    if not parts:
+        return None
+    return re.compile('|'.join(parts), re.IGNORECASE)
+
+
+def load_scope_config(path: str) -> Dict[str, Any]:
+    """Leer reglas de alcance de un fichero YAML (si PyYAML está disponible) o JSON"""
+    with open(path, encoding='utf-8') as f:
+        content = f.read()
+    if path.endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError as e:
+            raise ImportError("Leer configuración YAML requiere PyYAML: pip install pyyaml") from e
+        config = yaml.safe_load(content) or {}
+    else:
+        config = json.loads(content)
+    if not isinstance(config, dict):
+        raise ValueError(f"Configuración de alcance inválida en {path}: se esperaba un objeto")
+    unknown = set(config) - set(SCOPE_OPTIONS)
+    if unknown:
+        raise ValueError(f"Opciones de alcance desconocidas en {path}: {', '.join(sorted(unknown))}")
+    return config
+
+
+class CrawlScope:
+    """Reglas de alcance compiladas para un crawl"""
+
+    def __init__(self, start_url: str, include: Optional[List[str]] = None,
+                 exclude: Optional[List[str]] = None, allow_subdomains: bool = True,
+                 default_excludes: bool = True, max_depth: int = 12, max_segment_repeats: int = 2,
+                 max_query_params: int = 8, max_query_variants: int = 25,
+                 blocked_extensions: Optional[List[str]] = None):
+        start_host = (urlsplit(start_url).hostname or '').lower()
+        self.start_host = start_host[4:] if start_host.startswith('www.') else start_host
+        self.domain = registrable_domain(start_host)
+        self.allow_subdomains = allow_subdomains
+        self.include = compile_patterns(include or [])
+        self.exclude = compile_patterns(list(exclude or []) + (DEFAULT_EXCLUDES if default_excludes else []))
+        self.max_depth = max_depth
+        self.max_segment_repeats = max_segment_repeats
+        self.max_query_params = max_query_params
+        self.max_query_variants = max_query_variants
+        self.blocked_extensions = BLOCKED_EXTENSIONS | {
+            extension.lower() if extension.startswith('.') else f".{extension.lower()}"
+            for extension in (blocked_extensions or [])
+        }
+        self._query_variants: Dict[tuple, Set[str]] = {}
+        self._mime_cache: Dict[str, bool] = {}
+        self.rejections: Dict[str, int] = {}  # URLs distintas rechazadas por motivo
+        self._rejected: Dict[str, str] = {}  # URL canónica -> motivo, para contar cada una una vez
+
+    @classmethod
+    def from_config(cls, start_url: str, config: Optional[Dict[str, Any]] = None) -> 'CrawlScope':
+        """Crear el alcance a partir de un diccionario de opciones (ver SCOPE_OPTIONS)"""
+        return cls(start_url, **(config or {}))
+
+    def _host_in_scope(self, host: str) -> bool:
+        if self.allow_subdomains:
+            return host == self.domain or host.endswith('.' + self.domain)
+        return host in (self.start_host, 'www.' + self.start_host)
+
+    def _blocked_extension(self, path: str) -> bool:
+        extension = posixpath.splitext(path)[1].lower()
+        if not extension:
+            return False
+        if extension not in self._mime_cache:
+            mime_type = mimetypes.guess_type('file' + extension)[0] or ''
+            self._mime_cache[extension] = (
+                extension in self.blocked_extensions
+                or mime_type in BLOCKED_MIME_TYPES
+                or mime_type.startswith(BLOCKED_MIME_PREFIXES)
+            )
+        return self._mime_cache[extension]
+
+    def _path_trap(self, segments: List[str]) -> bool:
+        if len(segments) > self.max_depth:
+            return True
+        counts: Dict[str, int] = {}
+        for segment in segments:
+            counts[segment] = counts.get(segment, 0) + 1
+            if counts[segment] > self.max_segment_repeats:
+                return True
+        # Bloques de varios segmentos repetidos seguidos: /a/b/a/b. Un segmento suelto repetido
+        # (/2023/01/01/, /en/en/) es habitual y ya lo limita max_segment_repeats
+        for size in range(2, len(segments) // 2 + 1):
+            for start in range(len(segments) - 2 * size + 1):
+                if segments[start:start + size] == segments[start + size:start + 2 * size]:
+                    return True
+        return False
+
+    def check(self, url: str) -> Optional[str]:
+        """Motivo por el que la URL queda fuera del alcance, o None si se puede navegar.
+
+        Las URLs aceptadas con query cuentan como variante de su path para detectar trampas.
+        Un mismo enlace visto en varias páginas cuenta una sola vez en rejections.
+        """
+        try:
+            key = self.canonical(url)
+        except ValueError:
+            key = url
+        if key in self._rejected:
+            return self._rejected[key]
+        reason = self._check(url)
+        if reason:
+            self._rejected[key] = reason
+            self.rejections[reason] = self.rejections.get(reason, 0) + 1
+        return reason
+
+    def _check(self, url: str) -> Optional[str]:
+        try:
+            parts = urlsplit(url)
+            host = (parts.hostname or '').lower()
+        except ValueError:
+            return 'invalid'
+        if parts.scheme not in ('http', 'https') or not host:
+            return 'scheme'
+        if not self._host_in_scope(host):
+            return 'domain'
+        if self.exclude and self.exclude.search(url):
+            return 'excluded'
+        if self.include and not self.include.search(url):
+            return 'not_included'
+        if self._blocked_extension(parts.path):
+            return 'resource'
+        segments = [segment for segment in parts.path.split('/') if segment]
+        if self._path_trap(segments):
+            return 'path_trap'
+        if parts.query:
+            params = parse_qsl(parts.query, keep_blank_values=True)
+            if len(params) > self.max_query_params:
+                return 'query_trap'
+            variants = self._query_variants.setdefault((host, parts.path), set())
+            query = urlencode(sorted(params))
+            if query not in variants:
+                if len(variants) >= self.max_query_variants:
+                    return 'query_trap'
+                variants.add(query)
+        return None
+
+    def allows(self, url: str) -> bool:
+        """True si la URL está dentro del alcance"""
+        return self.check(url) is None
+
+    @staticmethod
+    def canonical(url: str) -> str:
+        """URL sin fragmento, para no visitar dos veces la misma página por sus anclas"""
+        parts = urlsplit(url)
+        return urlunsplit((parts.scheme, parts.netloc, parts.path, parts.query, ''))
+
+    def same_site(self, url: str) -> bool:
+        """True si la URL pertenece al sitio del crawl (sin aplicar el resto de reglas)"""
+        return self._host_in_scope((urlsplit(url).hostname or '').lower())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Logging no bloqueante para CAPTCHA Crawler by @M4rt1n_0x1337
+
+El bucle de eventos solo encola registros (QueueHandler); un hilo en segundo plano
+(QueueListener) los formatea y escribe en fichero y consola. Cada registro lleva los
+campos de contexto de la tarea asyncio que lo emitió (sitio, URL, ...), de modo que
+los logs de crawls concurrentes se pueden separar.
+"""
+
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+# Campos de contexto de la tarea actual; asyncio copia el contexto al crear cada tarea
+_log_context: contextvars.ContextVar = contextvars.ContextVar('captcha_crawler_log_context', default={})
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(context_str)s%(message)s'
+
+
+def set_log_context(**fields) -> contextvars.Token:
+    """Añadir campos de contexto a los logs de la tarea actual"""
+    merged = dict(_log_context.get())
+    merged.update({key: value for key, value in fields.items() if value is not None})
+    return _log_context.set(merged)
+
+
+def reset_log_context(token: contextvars.Token):
+    """Restaurar el contexto de logging anterior"""
+    _log_context.reset(token)
+
+
+@contextmanager
+def log_context(**fields):
+    """Context manager para añadir campos de contexto temporalmente"""
+    token = set_log_context(**fields)
+    try:
+        yield
+    finally:
+        reset_log_context(token)
+
+
+class ContextFilter(logging.Filter):
+    """Adjuntar el contexto de la tarea al registro en el hilo que lo emite"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _log_context.get()
+        record.context = context
+        record.context_str = ''.join(f"[{key}={value}] " for key, value in context.items())
+        return True
+
+
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que conserva mensaje y traza por separado.
+
+    El prepare() de la librería estándar mete la traza en el mensaje y borra exc_info;
+    aquí el mensaje queda limpio y la traza ya formateada va en exc_text, que los
+    formatters del hilo escritor emiten a su manera.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Formato estructurado: un objeto JSON por línea"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            'timestamp': datetime.fromtimestamp(record.created).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        payload.update(getattr(record, 'context', {}))
+        if record.exc_text:
+            payload['exception'] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def setup_logging(log_file: Optional[str] = 'captcha_crawler.log', level: int = logging.INFO,
+                  json_format: bool = False, max_bytes: int = 0, backup_count: int = 5,
+                  rotate_when: Optional[str] = None) -> logging.handlers.QueueListener:
+    """Configurar el pipeline de logging de la aplicación y arrancar el hilo escritor.
+
+    La rotación es por tamaño si max_bytes > 0, por tiempo si rotate_when está definido
+    (valores de TimedRotatingFileHandler: 'midnight', 'H', ...), o ninguna.
+    Devuelve el QueueListener, que hay que detener con shutdown_logging().
+    """
+    formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+
+    handlers = []
+    if log_file:
+        if rotate_when:
+            file_handler = logging.handlers.TimedRotatingFileHandler(
+                log_file, when=rotate_when, backupCount=backup_count, encoding='utf-8'
+            )
+        elif max_bytes > 0:
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+            )
+        else:
+            file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        handlers.append(file_handler)
+    handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # Cola sin límite: encolar nunca bloquea al bucle de eventos
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = RecordQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def shutdown_logging(listener: Optional[logging.handlers.QueueListener]):
+    """Vaciar la cola pendiente y cerrar los handlers"""
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
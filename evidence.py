@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Evidencias de detección para CAPTCHA Crawler by @M4rt1n_0x1337
+
+En el momento de la detección el crawler solo toma los bytes crudos (captura de
+pantalla y DOM); el hash, la codificación (PNG -> WebP, HTML -> zstd) y la
+escritura se hacen en un pool de hilos fuera del bucle de eventos. Los artefactos
+se guardan direccionados por su contenido, así que los repetidos entre sitios
+(páginas de challenge idénticas, por ejemplo) se almacenan una sola vez.
+
+Estructura del directorio:
+    objects/ab/abcdef....webp       Capturas de pantalla (o .png sin Pillow)
+    objects/ab/abcdef....html.zst   DOMs (o .html.gz sin zstandard)
+    evidence.jsonl                  Un registro por detección
+"""
+
+import asyncio
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional, Dict, List, Any, Iterable, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Proveedor asociado a cada fragmento de firma, en orden de prioridad
+PROVIDER_HINTS = [
+    ('hcaptcha', 'hcaptcha'),
+    ('h-captcha', 'hcaptcha'),
+    ('recaptcha', 'recaptcha'),
+    ('cf-challenge', 'cloudflare'),
+    ('cloudflare', 'cloudflare'),
+    ('challenge-form', 'cloudflare'),
+    ('funcaptcha', 'funcaptcha'),
+    ('arkoselabs', 'funcaptcha')
+]
+
+
+def infer_provider(signature: str) -> str:
+    """Deducir el proveedor de CAPTCHA a partir de la firma que coincidió"""
+    signature = (signature or '').lower()
+    for hint, provider in PROVIDER_HINTS:
+        if hint in signature:
+            return provider
+    return 'generic'
+
+
+def encode_screenshot(png: bytes) -> Tuple[bytes, str]:
+    """Convertir la captura a WebP si Pillow está disponible"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return png, '.png'
+    output = io.BytesIO()
+    with Image.open(io.BytesIO(png)) as image:
+        image.save(output, format='WEBP', quality=80, method=4)
+    return output.getvalue(), '.webp'
+
+
+def compress_dom(html: bytes) -> Tuple[bytes, str]:
+    """Comprimir el DOM con zstd si está disponible, o con gzip"""
+    try:
+        import zstandard
+    except ImportError:
+        return gzip.compress(html, compresslevel=6), '.html.gz'
+    return zstandard.ZstdCompressor(level=10).compress(html), '.html.zst'
+
+
+class EvidenceStore:
+    """Almacén de evidencias direccionado por contenido con codificación en segundo plano"""
+
+    SCREENSHOT_EXTENSIONS = ('.webp', '.png')
+    DOM_EXTENSIONS = ('.html.zst', '.html.gz')
+
+    def __init__(self, root: str, max_workers: int = 2):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.index_path = os.path.join(root, 'evidence.jsonl')
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='evidence')
+        self._pending: Set[asyncio.Future] = set()
+        self._index_lock = threading.Lock()
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+    def _find_object(self, digest: str, extensions: Tuple[str, ...]) -> Optional[str]:
+        for extension in extensions:
+            path = os.path.join(self.objects_dir, digest[:2], digest + extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _store(self, data: bytes, encoder, extensions: Tuple[str, ...]) -> Dict[str, Any]:
+        """Guardar un artefacto; si ya existe no se vuelve a codificar"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._find_object(digest, extensions)
+        deduplicated = path is not None
+        if path is None:
+            encoded, extension = encoder(data)
+            path = os.path.join(self.objects_dir, digest[:2], digest + extension)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(encoded)
+            os.replace(tmp_path, path)
+        return {
+            'sha256': digest,
+            'path': os.path.relpath(path, self.root),
+            'size': len(data),
+            'deduplicated': deduplicated
+        }
+
+    def _persist(self, metadata: Dict[str, Any], screenshot: Optional[bytes],
+                 dom: Optional[str]) -> Dict[str, Any]:
+        """Codificar, guardar e indexar una evidencia (se ejecuta en el pool de hilos)"""
+        record = dict(metadata)
+        if screenshot is not None:
+            record['screenshot'] = self._store(screenshot, encode_screenshot, self.SCREENSHOT_EXTENSIONS)
+        if dom is not None:
+            record['dom'] = self._store(dom.encode('utf-8'), compress_dom, self.DOM_EXTENSIONS)
+        with self._index_lock:
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return record
+
+    def submit(self, metadata: Dict[str, Any], screenshot: Optional[bytes] = None,
+               dom: Optional[str] = None) -> asyncio.Future:
+        """Encolar una evidencia sin esperar a que se codifique"""
+        metadata = dict(metadata)
+        metadata.setdefault('timestamp', datetime.now().isoformat())
+        if not metadata.get('provider'):
+            metadata['provider'] = infer_provider(metadata.get('signature'))
+        loop = asyncio.get_event_loop()
+        future = loop.run_in_executor(self._executor, self._persist, metadata, screenshot, dom)
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        return future
+
+    async def drain(self, futures: Optional[Iterable[asyncio.Future]] = None) -> List[Dict[str, Any]]:
+        """Esperar a que terminen las evidencias indicadas (por defecto, todas las pendientes).
+
+        Un crawler que comparte el almacén espera solo las suyas.
+        """
+        pending = list(self._pending if futures is None else futures)
+        if not pending:
+            return []
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        records = []
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.warning(f"Error guardando evidencia: {result}")
+            else:
+                records.append(result)
+        return records
+
+    async def close(self):
+        """Vaciar la cola y liberar el pool de hilos"""
+        await self.drain()
+        self._executor.shutdown(wait=True)
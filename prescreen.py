@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Cribado previo de DNS y accesibilidad para lotes de CAPTCHA Crawler by @M4rt1n_0x1337
+
+Antes de lanzar navegadores, resuelve y sondea todos los hosts del lote a la vez:
+
+- DNS asíncrono (aiodns si está instalado, si no getaddrinfo del bucle) con una caché
+  compartida: cada host se resuelve una sola vez aunque aparezca en varias URLs o
+  redirecciones, y las resoluciones en curso se comparten.
+- Sondeo ligero: un HEAD con httpx siguiendo las redirecciones a mano, o, si httpx no
+  está instalado (o el HEAD no responde), un handshake TCP/TLS. Ambos van a las IPs ya
+  resueltas por la caché (con la cabecera Host y el SNI del nombre original), probándolas
+  en orden hasta que una conecta.
+
+Cada URL queda clasificada como 'live', 'redirect' (acaba en otro dominio registrable),
+'dead' o 'unknown'. Solo son 'dead' los fallos definitivos (el dominio no existe,
+conexión rechazada, error TLS, bucle de redirecciones); un timeout o un fallo temporal
+de DNS deja la URL en 'unknown' y se crawlea igualmente. Los destinos canónicos de
+todo lo que no está muerto, sin duplicados, pasan a la fase de navegador.
+"""
+
+import asyncio
+import logging
+import socket
+import ssl
+import time
+from typing import Optional, Dict, List, Any, Iterable, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from crawl_scope import registrable_domain
+from retry_policy import PERMANENT, TRANSIENT, classify_error
+
+logger = logging.getLogger(__name__)
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+# Respuestas DNS definitivas (el nombre no existe o no tiene direcciones)
+DEFINITIVE_DNS_ERRORS = {socket.EAI_NONAME, getattr(socket, 'EAI_NODATA', socket.EAI_NONAME)}
+ARES_DEFINITIVE_ERRORS = {1, 4}  # ARES_ENODATA, ARES_ENOTFOUND
+
+
+def normalize_target(url: str) -> str:
+    """Añadir https:// a las entradas sin esquema (mismo criterio que el crawler)"""
+    url = url.strip()
+    return url if url.startswith(('http://', 'https://')) else 'https://' + url
+
+
+def classify_probe_error(error: BaseException) -> Tuple[str, str]:
+    """Clasificar un fallo del sondeo mirando también las excepciones encadenadas.
+
+    httpx envuelve los errores de socket y TLS: la causa útil suele estar en __cause__.
+    """
+    seen = set()
+    current: Optional[BaseException] = error
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        if isinstance(current, socket.gaierror) and current.errno not in DEFINITIVE_DNS_ERRORS:
+            return TRANSIENT, 'dns_temporary'  # EAI_AGAIN, SERVFAIL...
+        if type(current).__name__.endswith('Timeout'):
+            return TRANSIENT, 'timeout'
+        classification = classify_error(current)
+        if classification != (TRANSIENT, 'error'):
+            return classification
+        current = current.__cause__ or current.__context__
+    return TRANSIENT, 'error'
+
+
+class DNSCache:
+    """Resolución DNS asíncrona con caché compartida por todo el lote"""
+
+    def __init__(self, timeout: float = 5.0):
+        self.timeout = timeout
+        self._lookups: Dict[str, asyncio.Future] = {}
+        self._resolver = None
+        try:
+            import aiodns
+            self._resolver = aiodns.DNSResolver()
+        except ImportError:
+            logger.debug("aiodns no disponible, se usa getaddrinfo del bucle de eventos")
+
+    async def _lookup(self, host: str) -> List[str]:
+        if self._resolver is not None:
+            try:
+                result = await asyncio.wait_for(self._resolver.gethostbyname(host, socket.AF_UNSPEC),
+                                                self.timeout)
+            except asyncio.TimeoutError:
+                raise
+            except Exception as e:
+                code = e.args[0] if e.args and isinstance(e.args[0], int) else None
+                errno = socket.EAI_NONAME if code in ARES_DEFINITIVE_ERRORS else socket.EAI_AGAIN
+                raise socket.gaierror(errno, str(e)) from e
+            return list(result.addresses)
+        infos = await asyncio.wait_for(
+            asyncio.get_event_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM), self.timeout
+        )
+        return list(dict.fromkeys(info[4][0] for info in infos))
+
+    async def resolve(self, host: str) -> List[str]:
+        """Direcciones del host; lanza socket.gaierror si no resuelve"""
+        host = host.lower().rstrip('.')
+        if host not in self._lookups:
+            self._lookups[host] = asyncio.ensure_future(self._lookup(host))
+        return list(await asyncio.shield(self._lookups[host]))
+
+    def stats(self) -> Dict[str, int]:
+        """Hosts consultados y cuántos no resolvieron (por cualquier motivo)"""
+        done = [lookup for lookup in self._lookups.values() if lookup.done()]
+        return {'hosts': len(self._lookups),
+                'failed': sum(1 for lookup in done if lookup.cancelled() or lookup.exception())}
+
+
+def address_url(url: str, address: str) -> Tuple[str, str]:
+    """URL equivalente contra la IP address y la cabecera Host que le corresponde"""
+    parts = urlsplit(url)
+    host = parts.hostname
+    netloc = f"[{address}]" if ':' in address else address
+    if parts.port:
+        netloc += f":{parts.port}"
+        host += f":{parts.port}"
+    return parts._replace(netloc=netloc).geturl(), host
+
+
+async def try_addresses(addresses: List[str], attempt):
+    """Ejecutar attempt(address) con cada dirección en orden hasta que una funcione.
+
+    Devuelve el resultado de la primera que no falla; si fallan todas, lanza el último error.
+    """
+    error: Optional[BaseException] = None
+    for address in addresses:
+        try:
+            return await attempt(address)
+        except Exception as e:
+            error = e
+    if error is None:
+        raise socket.gaierror(socket.EAI_NONAME, 'sin direcciones')
+    raise error
+
+
+async def handshake(host: str, address: str, port: int, use_tls: bool, timeout: float):
+    """Abrir y cerrar una conexión TCP (y TLS con SNI y verificación) contra address"""
+    context = ssl.create_default_context() if use_tls else None
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(address, port, ssl=context, server_hostname=host if use_tls else None),
+        timeout
+    )
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except (OSError, ssl.SSLError):
+        pass
+
+
+class Prescreener:
+    """Sondeo concurrente de URLs de entrada con caché DNS compartida"""
+
+    def __init__(self, concurrency: int = 100, timeout: float = 5.0, max_redirects: int = 5,
+                 resolver: Optional[DNSCache] = None):
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.resolver = resolver or DNSCache(timeout)
+        self.client = None
+
+    def _open_client(self):
+        try:
+            import httpx
+        except ImportError:
+            logger.info("httpx no disponible: el cribado usa solo handshakes TCP/TLS")
+            return None
+        from captcha_crawler import USER_AGENT
+        return httpx.AsyncClient(
+            timeout=self.timeout, follow_redirects=False, headers={'User-Agent': USER_AGENT},
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=0)
+        )
+
+    async def _handshake(self, url: str, addresses: List[str]):
+        parts = urlsplit(url)
+        use_tls = parts.scheme == 'https'
+        port = parts.port or (443 if use_tls else 80)
+        await try_addresses(addresses, lambda address: handshake(parts.hostname, address, port,
+                                                                 use_tls, self.timeout))
+
+    async def _head(self, url: str, addresses: List[str]):
+        """HEAD a las IPs cacheadas, sin que httpx vuelva a resolver el nombre"""
+        hostname = urlsplit(url).hostname
+
+        async def attempt(address: str):
+            request_url, host = address_url(url, address)
+            return await self.client.head(request_url, headers={'Host': host},
+                                          extensions={'sni_hostname': hostname})
+
+        return await try_addresses(addresses, attempt)
+
+    async def _probe_url(self, url: str, entry: Dict[str, Any]) -> Optional[str]:
+        """Seguir la URL hasta su destino final (None si hay demasiadas redirecciones).
+
+        Lanza la excepción del salto que falle.
+        """
+        for _ in range(self.max_redirects + 1):
+            addresses = await self.resolver.resolve(urlsplit(url).hostname)
+            entry['addresses'] = addresses[:4]
+            if self.client is None:
+                await self._handshake(url, addresses)
+                entry['method'] = 'handshake'
+                return url
+            try:
+                response = await self._head(url, addresses)
+            except Exception as e:
+                kind, reason = classify_probe_error(e)
+                if kind == PERMANENT:
+                    raise
+                # Servidores que no contestan bien a HEAD: basta con que acepten la conexión
+                await self._handshake(url, addresses)
+                entry['method'] = f"handshake ({reason} en HEAD)"
+                return url
+            entry['method'] = 'head'
+            entry['http_status'] = response.status_code
+            location = response.headers.get('location')
+            if response.status_code not in REDIRECT_STATUSES or not location:
+                return url
+            url = urljoin(url, location)
+            entry['redirects'] = entry.get('redirects', 0) + 1
+        return None
+
+    async def probe(self, raw_url: str) -> Dict[str, Any]:
+        """Clasificar una URL de entrada como 'live', 'redirect', 'dead' o 'unknown'"""
+        started = time.perf_counter()
+        url = normalize_target(raw_url)
+        entry: Dict[str, Any] = {'url': raw_url, 'status': 'dead', 'target': None, 'reason': None,
+                                 'http_status': None, 'addresses': [], 'method': None}
+        if not urlsplit(url).hostname:
+            entry['reason'] = 'invalid_url'
+            entry['seconds'] = round(time.perf_counter() - started, 3)
+            return entry
+        candidates = [url]
+        if not raw_url.strip().startswith(('http://', 'https://')):
+            candidates.append('http://' + url[len('https://'):])  # Sitios sin HTTPS
+        for candidate in candidates:
+            try:
+                target = await self._probe_url(candidate, entry)
+            except Exception as e:
+                kind, entry['reason'] = classify_probe_error(e)
+                if kind == TRANSIENT:
+                    # Un mal momento del host o del DNS no basta para descartarlo
+                    entry['status'], entry['target'] = 'unknown', candidate
+                    break
+                if entry['reason'] in ('refused', 'tls'):
+                    continue
+                break
+            if target is None:
+                entry['reason'] = 'redirect_loop'
+                break
+            entry['target'] = target
+            entry['reason'] = None
+            same_site = registrable_domain(urlsplit(target).hostname) == registrable_domain(urlsplit(url).hostname)
+            entry['status'] = 'live' if same_site else 'redirect'
+            break
+        entry['seconds'] = round(time.perf_counter() - started, 3)
+        return entry
+
+    async def run(self, urls: Iterable[str]) -> List[Dict[str, Any]]:
+        """Sondear todas las URLs (como mucho concurrency a la vez), en el orden de entrada"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(url: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.probe(url)
+
+        self.client = self._open_client()
+        try:
+            return list(await asyncio.gather(*(bounded(url) for url in urls)))
+        finally:
+            if self.client is not None:
+                await self.client.aclose()
+                self.client = None
+
+
+async def prescreen_urls(urls: Iterable[str], concurrency: int = 100, timeout: float = 5.0) -> List[Dict[str, Any]]:
+    """Cribar un lote de URLs (ver Prescreener)"""
+    return await Prescreener(concurrency, timeout).run(urls)
+
+
+def live_targets(entries: List[Dict[str, Any]]) -> List[str]:
+    """Destinos canónicos de las entradas no descartadas (vivas, redirigidas o dudosas), sin duplicados"""
+    return list(dict.fromkeys(entry['target'] for entry in entries if entry['status'] != 'dead'))
+
+
+def summarize_prescreen(entries: List[Dict[str, Any]], seconds: float) -> Dict[str, Any]:
+    """Recuento por estado y por motivo de fallo, con las entradas completas"""
+    statuses: Dict[str, int] = {}
+    reasons: Dict[str, int] = {}
+    for entry in entries:
+        statuses[entry['status']] = statuses.get(entry['status'], 0) + 1
+        if entry['reason']:
+            reasons[entry['reason']] = reasons.get(entry['reason'], 0) + 1
+    return {'seconds': round(seconds, 2), 'statuses': statuses, 'reasons': reasons,
+            'targets': len(live_targets(entries)), 'entries': entries}
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Modo de profiling para CAPTCHA Crawler by @M4rt1n_0x1337
+
+Separa el coste de cada método del crawler en tres partes:
+
+- CPU de Python: tiempo con el frame de la corrutina en la pila (cProfile solo cuenta
+  una corrutina mientras está activa, no mientras espera en un await).
+- Pausas: tiempo en CaptchaCrawler.pause (delays de simulación humana).
+- Espera: el resto del tiempo de reloj, es decir, round-trips CDP, carga y render de
+  páginas en Chromium.
+
+Opcionalmente graba trazas de Playwright (context.tracing) de las primeras páginas.
+Todo se guarda en un directorio por ejecución con un resumen de los métodos más caros.
+"""
+
+import asyncio
+import contextvars
+import cProfile
+import functools
+from contextlib import contextmanager
+import io
+import json
+import os
+import pstats
+import time
+from datetime import datetime
+from typing import Optional, Dict, List, Any
+
+# Métodos de CaptchaCrawler que se instrumentan por defecto
+DEFAULT_METHODS = [
+    'crawl_site_for_captcha',
+    'start_browser',
+    'navigate_to_url',
+    'detect_captcha',
+    'handle_captcha',
+    'get_page_links',
+    'deep_page_exploration',
+    'deep_ecommerce_navigation',
+    'explore_products_in_background',
+    'simulate_product_reading',
+    'navigate_pagination',
+    'interact_with_filters',
+    'comprehensive_page_scroll',
+    'explore_forms',
+    'interact_with_media',
+    'simulate_extended_user_activity',
+    'trigger_dynamic_content',
+    'standard_page_interaction',
+    'build_interaction_index',
+    'capture_page_snapshot',
+    'capture_evidence'
+]
+
+# Pila de métodos instrumentados de la tarea actual, para atribuir las pausas
+_method_stack: contextvars.ContextVar = contextvars.ContextVar('captcha_crawler_profile_stack', default=())
+
+
+class CrawlProfiler:
+    """Profiler de un crawl: cProfile, tiempos por método y trazas de Playwright"""
+
+    def __init__(self, output_dir: str = 'profiles', trace_pages: int = 0):
+        self.run_dir = os.path.join(output_dir, datetime.now().strftime('%Y%m%d-%H%M%S'))
+        self.trace_pages = trace_pages  # Páginas iniciales con traza de Playwright
+        self.traced_pages = 0
+        self.methods: Dict[str, Dict[str, float]] = {}
+        self._method_codes: Dict[tuple, str] = {}  # Clave de pstats (fichero, línea, función) -> método
+        self._profile = cProfile.Profile()
+        self._started = None
+        self.wall_seconds = 0.0
+        os.makedirs(self.run_dir, exist_ok=True)
+
+    def _stats_for(self, name: str) -> Dict[str, float]:
+        if name not in self.methods:
+            self.methods[name] = {'calls': 0, 'wall': 0.0, 'wall_max': 0.0, 'sleep': 0.0}
+        return self.methods[name]
+
+    def instrument(self, crawler, methods: Optional[List[str]] = None):
+        """Envolver los métodos asíncronos del crawler con medición de tiempo de reloj"""
+        for name in methods or DEFAULT_METHODS:
+            method = getattr(crawler, name, None)
+            if method is None or not asyncio.iscoroutinefunction(method):
+                continue
+            setattr(crawler, name, self._wrap(name, method))
+        if asyncio.iscoroutinefunction(getattr(crawler, 'pause', None)):
+            crawler.pause = self._wrap_pause(crawler.pause)
+
+    def _wrap(self, name: str, method):
+        code = method.__code__
+        self._method_codes[(code.co_filename, code.co_firstlineno, code.co_name)] = name
+
+        @functools.wraps(method)
+        async def timed(*args, **kwargs):
+            token = _method_stack.set(_method_stack.get() + (name,))
+            started = time.perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                _method_stack.reset(token)
+                stats = self._stats_for(name)
+                stats['calls'] += 1
+                stats['wall'] += elapsed
+                stats['wall_max'] = max(stats['wall_max'], elapsed)
+        return timed
+
+    def _wrap_pause(self, pause):
+        """Atribuir el tiempo de las pausas del crawler a los métodos activos de la tarea"""
+        @functools.wraps(pause)
+        async def accounted_pause(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await pause(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                for name in set(_method_stack.get()):
+                    self._stats_for(name)['sleep'] += elapsed
+        return accounted_pause
+
+    def start(self):
+        """Empezar a perfilar"""
+        self._started = time.perf_counter()
+        self._profile.enable()
+
+    def stop(self):
+        """Dejar de perfilar y escribir los resultados"""
+        self._profile.disable()
+        self.wall_seconds = time.perf_counter() - self._started
+        self.write()
+
+    @contextmanager
+    def session(self):
+        """Perfilar el bloque; los resultados se escriben aunque el crawl falle"""
+        self.start()
+        try:
+            yield self
+        finally:
+            self.stop()
+
+    def should_trace(self) -> bool:
+        """Indica si la siguiente página debe grabarse con traza de Playwright"""
+        return self.traced_pages < self.trace_pages
+
+    def next_trace_path(self) -> str:
+        """Ruta del siguiente fichero de traza"""
+        self.traced_pages += 1
+        return os.path.join(self.run_dir, f'trace-{self.traced_pages:03d}.zip')
+
+    def _python_cpu(self, stats: pstats.Stats) -> Dict[str, float]:
+        """CPU de Python (cumtime de cProfile) de cada método instrumentado"""
+        cpu: Dict[str, float] = {}
+        for key, (_, _, _, cumtime, _) in stats.stats.items():
+            name = self._method_codes.get(key)
+            if name:
+                cpu[name] = cpu.get(name, 0.0) + cumtime
+        return cpu
+
+    def summary(self, stats: pstats.Stats) -> List[Dict[str, Any]]:
+        """Métodos ordenados por tiempo de reloj con su desglose"""
+        cpu = self._python_cpu(stats)
+        rows = []
+        for name, method_stats in self.methods.items():
+            python_cpu = min(cpu.get(name, 0.0), method_stats['wall'])
+            sleep = min(method_stats['sleep'], method_stats['wall'] - python_cpu)
+            rows.append({
+                'method': name,
+                'calls': method_stats['calls'],
+                'wall_seconds': round(method_stats['wall'], 3),
+                'wall_max_seconds': round(method_stats['wall_max'], 3),
+                'python_cpu_seconds': round(python_cpu, 3),
+                'sleep_seconds': round(sleep, 3),
+                'browser_wait_seconds': round(max(0.0, method_stats['wall'] - python_cpu - sleep), 3)
+            })
+        rows.sort(key=lambda row: row['wall_seconds'], reverse=True)
+        return rows
+
+    def write(self):
+        """Guardar pstats, resumen por método (JSON y texto) y top de funciones Python"""
+        self._profile.dump_stats(os.path.join(self.run_dir, 'python.pstats'))
+        stats = pstats.Stats(self._profile)
+        rows = self.summary(stats)
+
+        with open(os.path.join(self.run_dir, 'methods.json'), 'w', encoding='utf-8') as f:
+            json.dump({'wall_seconds': round(self.wall_seconds, 3), 'methods': rows}, f, indent=2)
+
+        top_functions = io.StringIO()
+        pstats.Stats(self._profile, stream=top_functions).sort_stats('tottime').print_stats(25)
+
+        with open(os.path.join(self.run_dir, 'summary.txt'), 'w', encoding='utf-8') as f:
+            f.write(f"Tiempo total: {self.wall_seconds:.1f}s\n")
+            f.write("Tiempos inclusivos (un método incluye a los que llama)\n\n")
+            f.write(f"{'método':<32}{'llamadas':>9}{'reloj':>10}{'máx':>9}{'cpu py':>9}{'pausas':>9}{'espera':>9}\n")
+            for row in rows:
+                f.write(f"{row['method']:<32}{row['calls']:>9}{row['wall_seconds']:>10.2f}"
+                        f"{row['wall_max_seconds']:>9.2f}{row['python_cpu_seconds']:>9.2f}"
+                        f"{row['sleep_seconds']:>9.2f}{row['browser_wait_seconds']:>9.2f}\n")
+            f.write("\nFunciones Python con más tiempo propio:\n")
+            f.write(top_functions.getvalue())
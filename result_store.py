@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Almacén de resultados SQLite para CAPTCHA Crawler by @M4rt1n_0x1337
+
+Cada ejecución, página visitada y detección es una fila, con índices por dominio,
+proveedor, fecha y huella de URL, de modo que consultas sobre meses de historia
+("qué dominios mostraron hCaptcha la semana pasada") no necesitan leer ficheros JSON.
+Cada ejecución se inserta en una sola transacción.
+"""
+
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Optional, Dict, List, Any
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    start_url TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    captcha_found INTEGER NOT NULL,
+    captcha_solved INTEGER NOT NULL,
+    pages_visited INTEGER NOT NULL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_domain ON runs(domain, started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs(started_at);
+
+CREATE TABLE IF NOT EXISTS page_visits (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    url TEXT NOT NULL,
+    url_fingerprint TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    visited_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_visits_run ON page_visits(run_id);
+CREATE INDEX IF NOT EXISTS idx_visits_domain ON page_visits(domain, visited_at);
+CREATE INDEX IF NOT EXISTS idx_visits_fingerprint ON page_visits(url_fingerprint);
+
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    url TEXT NOT NULL,
+    url_fingerprint TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    provider TEXT,
+    confidence REAL,
+    signature TEXT,
+    frame_url TEXT,
+    detected_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_detections_run ON detections(run_id);
+CREATE INDEX IF NOT EXISTS idx_detections_domain ON detections(domain, detected_at);
+CREATE INDEX IF NOT EXISTS idx_detections_provider ON detections(provider, detected_at);
+CREATE INDEX IF NOT EXISTS idx_detections_detected ON detections(detected_at);
+CREATE INDEX IF NOT EXISTS idx_detections_fingerprint ON detections(url_fingerprint);
+"""
+
+
+def url_domain(url: str) -> str:
+    """Host de una URL en minúsculas"""
+    return (urlsplit(url).hostname or '').lower()
+
+
+def url_fingerprint(url: str) -> str:
+    """Huella estable de una URL: esquema y host en minúsculas, sin fragmento y con la query ordenada"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    normalized = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', query, ''))
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+class ResultStore:
+    """Almacén SQLite de ejecuciones, visitas y detecciones"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute('PRAGMA foreign_keys=ON')
+        self._connection.executescript(SCHEMA)
+
+    def close(self):
+        """Cerrar la conexión"""
+        with self._lock:
+            self._connection.close()
+
+    def record_run(self, result: Dict[str, Any]) -> int:
+        """Guardar un resultado de crawl_site_for_captcha en una sola transacción"""
+        started_at = result.get('timestamp') or datetime.now().isoformat()
+        finished_at = datetime.now().isoformat()
+        visits = result.get('page_visits') or [
+            {'url': url, 'timestamp': started_at} for url in result.get('visited_urls', [])
+        ]
+        detections = result.get('detections', [])
+
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                'INSERT INTO runs (start_url, domain, started_at, finished_at, success, captcha_found, '
+                'captcha_solved, pages_visited, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (result['start_url'], url_domain(result['start_url']), started_at, finished_at,
+                 int(result.get('success', False)), int(result.get('captcha_found', False)),
+                 int(result.get('captcha_solved', False)), result.get('pages_visited', 0),
+                 result.get('error'))
+            )
+            run_id = cursor.lastrowid
+            self._connection.executemany(
+                'INSERT INTO page_visits (run_id, url, url_fingerprint, domain, visited_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                [(run_id, visit['url'], url_fingerprint(visit['url']), url_domain(visit['url']),
+                  visit['timestamp']) for visit in visits]
+            )
+            self._connection.executemany(
+                'INSERT INTO detections (run_id, url, url_fingerprint, domain, provider, confidence, '
+                'signature, frame_url, detected_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(run_id, detection['url'], url_fingerprint(detection['url']), url_domain(detection['url']),
+                  detection.get('provider'), detection.get('confidence'), detection.get('signature'),
+                  detection.get('frame_url'), detection['timestamp']) for detection in detections]
+            )
+        return run_id
+
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(row) for row in self._connection.execute(sql, params)]
+
+    def find_detections(self, domain: Optional[str] = None, provider: Optional[str] = None,
+                        since: Optional[str] = None, until: Optional[str] = None,
+                        limit: int = 100) -> List[Dict[str, Any]]:
+        """Detecciones filtradas por dominio, proveedor y rango de fechas (ISO 8601)"""
+        conditions, params = [], []
+        if domain:
+            conditions.append('domain = ?')
+            params.append(domain.lower())
+        if provider:
+            conditions.append('provider = ?')
+            params.append(provider)
+        if since:
+            conditions.append('detected_at >= ?')
+            params.append(since)
+        if until:
+            conditions.append('detected_at < ?')
+            params.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        return self._query(
+            f'SELECT run_id, domain, url, provider, confidence, signature, frame_url, detected_at '
+            f'FROM detections {where} ORDER BY detected_at DESC LIMIT ?',
+            tuple(params) + (limit,)
+        )
+
+    def find_runs(self, domain: Optional[str] = None, since: Optional[str] = None,
+                  until: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Ejecuciones filtradas por dominio y rango de fechas"""
+        conditions, params = [], []
+        if domain:
+            conditions.append('domain = ?')
+            params.append(domain.lower())
+        if since:
+            conditions.append('started_at >= ?')
+            params.append(since)
+        if until:
+            conditions.append('started_at < ?')
+            params.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        return self._query(
+            f'SELECT id, start_url, domain, started_at, finished_at, success, captcha_found, '
+            f'captcha_solved, pages_visited, error FROM runs {where} ORDER BY started_at DESC LIMIT ?',
+            tuple(params) + (limit,)
+        )
+
+    def diff_runs(self, old_run_id: int, new_run_id: int) -> Dict[str, List[Dict[str, Any]]]:
+        """Detecciones (URL, proveedor) que aparecen o desaparecen entre dos ejecuciones"""
+        def detection_keys(run_id: int) -> Dict[tuple, Dict[str, Any]]:
+            rows = self._query(
+                'SELECT url_fingerprint, url, provider, confidence FROM detections WHERE run_id = ?',
+                (run_id,)
+            )
+            return {(row['url_fingerprint'], row['provider']): row for row in rows}
+
+        old, new = detection_keys(old_run_id), detection_keys(new_run_id)
+        return {
+            'added': [new[key] for key in new.keys() - old.keys()],
+            'removed': [old[key] for key in old.keys() - new.keys()],
+            'unchanged': [new[key] for key in new.keys() & old.keys()]
+        }
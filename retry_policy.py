@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Política de reintentos y circuit breaker por host para CAPTCHA Crawler by @M4rt1n_0x1337
+
+Los fallos de navegación se clasifican antes de decidir si se reintentan:
+
+- Permanentes: DNS que no resuelve, errores TLS/certificado, conexión rechazada o
+  dirección inalcanzable. Repetirlos no cambia nada, así que no se reintentan y
+  abren el circuito del host de inmediato.
+- Transitorios: timeouts, cortes de conexión, HTTP 5xx/429 y páginas casi vacías.
+  Se reintentan con backoff exponencial y jitter mientras quede presupuesto de
+  reintentos del sitio.
+
+El circuit breaker cuenta los fallos consecutivos de cada host. Con el circuito
+abierto las URLs de ese host se descartan sin navegar; pasado reset_timeout se
+deja pasar una única navegación de prueba (semiabierto) que lo cierra o lo reabre.
+Una prueba cuyo resultado no llega en probe_timeout se da por perdida y se permite otra.
+"""
+
+import logging
+import random
+import socket
+import ssl
+import time
+from typing import Optional, Dict, Any, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+PERMANENT = 'permanent'
+TRANSIENT = 'transient'
+
+# Códigos de error de red de Chromium (net::ERR_*) -> (tipo, motivo)
+NET_ERRORS = {
+    'ERR_NAME_NOT_RESOLVED': (PERMANENT, 'dns'),
+    'ERR_NAME_RESOLUTION_FAILED': (PERMANENT, 'dns'),
+    'ERR_CONNECTION_REFUSED': (PERMANENT, 'refused'),
+    'ERR_ADDRESS_UNREACHABLE': (PERMANENT, 'unreachable'),
+    'ERR_ADDRESS_INVALID': (PERMANENT, 'unreachable'),
+    'ERR_TOO_MANY_REDIRECTS': (PERMANENT, 'redirect_loop'),
+    'ERR_UNSAFE_REDIRECT': (PERMANENT, 'redirect_loop'),
+    'ERR_INVALID_URL': (PERMANENT, 'invalid_url'),
+    'ERR_UNKNOWN_URL_SCHEME': (PERMANENT, 'invalid_url'),
+    'ERR_SSL_': (PERMANENT, 'tls'),
+    'ERR_CERT_': (PERMANENT, 'tls'),
+    'ERR_BAD_SSL_CLIENT_AUTH_CERT': (PERMANENT, 'tls'),
+    'ERR_TIMED_OUT': (TRANSIENT, 'timeout'),
+    'ERR_CONNECTION_TIMED_OUT': (TRANSIENT, 'timeout'),
+    'ERR_CONNECTION_RESET': (TRANSIENT, 'connection'),
+    'ERR_CONNECTION_CLOSED': (TRANSIENT, 'connection'),
+    'ERR_CONNECTION_ABORTED': (TRANSIENT, 'connection'),
+    'ERR_EMPTY_RESPONSE': (TRANSIENT, 'connection'),
+    'ERR_NETWORK_CHANGED': (TRANSIENT, 'connection'),
+    'ERR_INTERNET_DISCONNECTED': (TRANSIENT, 'connection'),
+    'ERR_HTTP2_PROTOCOL_ERROR': (TRANSIENT, 'protocol'),
+    'ERR_QUIC_PROTOCOL_ERROR': (TRANSIENT, 'protocol'),
+}
+
+# Fallos en los que el host sí respondió: para su circuito cuentan como navegación correcta
+NON_HOST_REASONS = {'captcha'}
+
+# Opciones aceptadas por RetryPolicy (CLI y servicio)
+RETRY_OPTIONS = ('max_attempts', 'base_delay', 'max_delay', 'site_budget',
+                 'breaker_threshold', 'breaker_reset')
+
+
+def classify_error(error: BaseException) -> Tuple[str, str]:
+    """Clasificar una excepción de navegación o de red como (tipo, motivo)"""
+    if isinstance(error, socket.gaierror):
+        return PERMANENT, 'dns'
+    if isinstance(error, (ssl.SSLError, ssl.CertificateError)):
+        return PERMANENT, 'tls'
+    if isinstance(error, ConnectionRefusedError):
+        return PERMANENT, 'refused'
+    if isinstance(error, TimeoutError) or type(error).__name__ == 'TimeoutError':
+        return TRANSIENT, 'timeout'  # incluye el TimeoutError de Playwright
+    message = str(error)
+    for code, classification in NET_ERRORS.items():
+        if f"net::{code}" in message:
+            return classification
+    if isinstance(error, ConnectionError):
+        return TRANSIENT, 'connection'
+    return TRANSIENT, 'error'
+
+
+def classify_status(status: Optional[int]) -> Optional[Tuple[str, str]]:
+    """Clasificar un código HTTP de fallo del servidor, o None si la respuesta es utilizable"""
+    if status is None:
+        return None
+    if status >= 500:
+        return TRANSIENT, 'http_5xx'
+    if status == 429:
+        return TRANSIENT, 'http_429'
+    return None
+
+
+class HostCircuitBreaker:
+    """Circuit breaker por host: cerrado, abierto o semiabierto"""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 120.0,
+                 probe_timeout: Optional[float] = None):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = reset_timeout if probe_timeout is None else probe_timeout
+        self._hosts: Dict[str, Dict[str, Any]] = {}
+
+    def _entry(self, host: str) -> Dict[str, Any]:
+        return self._hosts.setdefault(host, {'failures': 0, 'opened_at': None, 'probing': False,
+                                             'probe_at': None, 'reason': None, 'skipped': 0, 'opened': 0})
+
+    def state(self, host: str) -> str:
+        """Estado del circuito de un host: 'closed', 'open' o 'half_open'"""
+        entry = self._hosts.get(host)
+        if not entry or entry['opened_at'] is None:
+            return 'closed'
+        if time.monotonic() - entry['opened_at'] >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self, host: str) -> bool:
+        """True si se puede navegar al host; en semiabierto solo pasa una navegación de prueba"""
+        state = self.state(host)
+        if state == 'closed':
+            return True
+        entry = self._hosts[host]
+        if entry['probing'] and time.monotonic() - entry['probe_at'] >= self.probe_timeout:
+            logger.info(f"Navegación de prueba sin resultado para {host}, se permite otra")
+            entry['probing'] = False
+        if state == 'half_open' and not entry['probing']:
+            entry['probing'] = True
+            entry['probe_at'] = time.monotonic()
+            logger.info(f"Circuito semiabierto para {host}: navegación de prueba")
+            return True
+        entry['skipped'] += 1
+        return False
+
+    def record_success(self, host: str):
+        """Cerrar el circuito del host tras una navegación correcta"""
+        entry = self._hosts.get(host)
+        if entry:
+            if entry['opened_at'] is not None:
+                logger.info(f"Circuito cerrado para {host}")
+            entry.update(failures=0, opened_at=None, probing=False)
+
+    def record_failure(self, host: str, kind: str, reason: str):
+        """Contar un fallo del host y abrir su circuito si es permanente o se supera el umbral"""
+        entry = self._entry(host)
+        entry['failures'] += 1
+        entry['reason'] = reason
+        if entry['probing'] or kind == PERMANENT or entry['failures'] >= self.failure_threshold:
+            if entry['opened_at'] is None or entry['probing']:
+                entry['opened'] += 1
+                logger.warning(f"Circuito abierto para {host} ({reason}, {entry['failures']} fallos seguidos)")
+            entry['opened_at'] = time.monotonic()
+            entry['probing'] = False
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Hosts que han fallado alguna vez, con su estado y URLs descartadas"""
+        return {
+            host: {'state': self.state(host), 'failures': entry['failures'], 'reason': entry['reason'],
+                   'opened': entry['opened'], 'skipped': entry['skipped']}
+            for host, entry in self._hosts.items()
+        }
+
+
+class RetryPolicy:
+    """Reintentos con backoff exponencial, jitter y presupuesto por sitio"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 2.0, max_delay: float = 30.0,
+                 site_budget: int = 10, breaker_threshold: int = 3, breaker_reset: float = 120.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.site_budget = site_budget  # Reintentos totales permitidos en el crawl de un sitio
+        self.breaker = HostCircuitBreaker(breaker_threshold, breaker_reset)
+        self.retries = 0
+        self.failures: Dict[str, int] = {}  # Fallos por motivo
+        self.budget_exhausted = False
+
+    @staticmethod
+    def host(url: str) -> str:
+        return (urlparse(url).hostname or '').lower()
+
+    def allow(self, url: str) -> bool:
+        """True si el circuito del host de la URL permite navegar"""
+        return self.breaker.allow(self.host(url))
+
+    def backoff(self, attempt: int) -> float:
+        """Espera antes del reintento attempt + 1: mitad fija y mitad aleatoria (equal jitter)"""
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def record_success(self, url: str):
+        self.breaker.record_success(self.host(url))
+
+    def record_failure(self, url: str, kind: str, reason: str):
+        """Registrar un fallo clasificado de navegación a url"""
+        self.failures[reason] = self.failures.get(reason, 0) + 1
+        if reason in NON_HOST_REASONS:
+            # El host respondió (p. ej. con un CAPTCHA): cuenta como navegación correcta para su circuito
+            self.breaker.record_success(self.host(url))
+        else:
+            self.breaker.record_failure(self.host(url), kind, reason)
+
+    def should_retry(self, url: str, kind: str, attempt: int, max_attempts: Optional[int] = None) -> bool:
+        """Decidir si se reintenta tras el fallo del intento attempt (consume presupuesto)"""
+        if kind == PERMANENT or attempt + 1 >= (max_attempts or self.max_attempts):
+            return False
+        if self.state(url) == 'open':
+            return False
+        if self.retries >= self.site_budget:
+            if not self.budget_exhausted:
+                logger.warning(f"Presupuesto de reintentos del sitio agotado ({self.site_budget})")
+                self.budget_exhausted = True
+            return False
+        self.retries += 1
+        return True
+
+    def state(self, url: str) -> str:
+        return self.breaker.state(self.host(url))
+
+    def metrics(self) -> Dict[str, Any]:
+        """Reintentos gastados, fallos por motivo y estado de los circuitos"""
+        return {
+            'retries': self.retries,
+            'site_budget': self.site_budget,
+            'budget_exhausted': self.budget_exhausted,
+            'failures': dict(self.failures),
+            'hosts': self.breaker.metrics()
+        }
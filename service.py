@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Servicio de crawl de larga duración para CAPTCHA Crawler by @M4rt1n_0x1337
+
+Mantiene un pool de navegadores ya lanzados, cada uno con un contexto ya creado, y
+recibe trabajos por una API HTTP local (TCP o socket Unix). Cada sitio de un trabajo
+toma un navegador del pool, se crawlea con la lógica de CaptchaCrawler sobre su
+contexto y, al terminar, el contexto se cierra y se sustituye por uno nuevo (sin
+cookies, almacenamiento ni pestañas del trabajo anterior) antes de volver al pool.
+Así un trabajo no paga el arranque de Python, de Playwright ni de Chromium.
+
+API (JSON):
+    POST   /jobs                {"url": ...} o {"urls": [...]}, opciones: max_pages,
+                                product_tabs, timeout, scope, retry
+    GET    /jobs                Trabajos conocidos
+    GET    /jobs/<id>           Estado y resultados
+    GET    /jobs/<id>/stream    Eventos en NDJSON hasta que el trabajo termina
+    DELETE /jobs/<id>           Cancelar
+    GET    /health              Estado del pool
+"""
+
+import asyncio
+import json
+import logging
+import os
+import signal
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Optional, Dict, List, Any, Callable
+
+from batch import failed_result
+from browser_profiles import get_browser_profile
+from captcha_crawler import CaptchaCrawler, load_playwright, launch_browser, create_context
+from crawl_scope import SCOPE_OPTIONS
+from retry_policy import RETRY_OPTIONS
+
+logger = logging.getLogger(__name__)
+
+JOB_OPTIONS = ('max_pages', 'product_tabs', 'timeout', 'scope', 'retry')
+TERMINAL_STATUSES = ('done', 'failed', 'cancelled')
+MAX_BODY_BYTES = 1024 * 1024
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_job_options(options: Dict[str, Any]):
+    """Comprobar tipos y claves de las opciones de un trabajo; lanza ValueError (400) si no valen"""
+    for key, minimum in (('max_pages', 1), ('product_tabs', 0)):
+        value = options.get(key, minimum)
+        if not (_is_number(value) and isinstance(value, int) and value >= minimum):
+            raise ValueError(f"'{key}' debe ser un entero mayor o igual que {minimum}")
+    if 'timeout' in options and not (_is_number(options['timeout']) and options['timeout'] > 0):
+        raise ValueError("'timeout' debe ser un número positivo de segundos")
+    for key, known, label in (('scope', SCOPE_OPTIONS, 'alcance'), ('retry', RETRY_OPTIONS, 'reintento')):
+        value = options.get(key)
+        if value is None:
+            continue
+        if not isinstance(value, dict):
+            raise ValueError(f"'{key}' debe ser un objeto JSON")
+        unknown = set(value) - set(known)
+        if unknown:
+            raise ValueError(f"opciones de {label} desconocidas: {', '.join(sorted(unknown))}")
+    invalid = [key for key, value in (options.get('retry') or {}).items() if not _is_number(value)]
+    if invalid:
+        raise ValueError(f"las opciones de reintento deben ser números: {', '.join(sorted(invalid))}")
+
+
+class BrowserPool:
+    """Navegadores precalentados, cada uno con un contexto listo para el siguiente trabajo"""
+
+    def __init__(self, size: int = 2, browser_profile: str = 'standard', headless: bool = True,
+                 executable_path: Optional[str] = None):
+        self.size = max(1, size)
+        self.profile = get_browser_profile(browser_profile)
+        self.headless = headless
+        self.executable_path = executable_path
+        self.playwright = None
+        self.leases = 0
+        self.relaunches = 0
+        self._slots: List[Dict[str, Any]] = []
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._resets: set = set()
+
+    async def start(self):
+        """Lanzar los navegadores y crear sus contextos"""
+        started = time.perf_counter()
+        self.playwright = await load_playwright().async_playwright().start()
+        for slot_id in range(self.size):
+            browser = await launch_browser(self.playwright, self.profile, self.headless, self.executable_path)
+            slot = {'id': slot_id, 'browser': browser, 'context': await create_context(browser, self.profile)}
+            self._slots.append(slot)
+            self._idle.put_nowait(slot)
+        logger.info(f"Pool de {self.size} navegadores listo en {time.perf_counter() - started:.1f}s "
+                    f"(perfil {self.profile['name']})")
+
+    async def _prepare(self, slot: Dict[str, Any]):
+        """Relanzar el navegador si se ha caído y crear el contexto si falta"""
+        if not slot['browser'].is_connected():
+            logger.warning(f"Navegador {slot['id']} desconectado, relanzando")
+            slot['browser'] = await launch_browser(self.playwright, self.profile, self.headless,
+                                                   self.executable_path)
+            slot['context'] = None
+            self.relaunches += 1
+        if slot['context'] is None:
+            slot['context'] = await create_context(slot['browser'], self.profile)
+
+    async def _reset(self, slot: Dict[str, Any], context):
+        """Descartar el contexto usado y dejar uno nuevo preparado"""
+        try:
+            await context.close()
+        except Exception:
+            pass
+        try:
+            await self._prepare(slot)
+        except Exception as e:
+            logger.warning(f"Error preparando el navegador {slot['id']}: {e}")
+        self._idle.put_nowait(slot)
+
+    @asynccontextmanager
+    async def lease(self):
+        """Tomar un navegador con contexto limpio; al salir, el contexto se reinicia en segundo plano"""
+        slot = await self._idle.get()
+        try:
+            await self._prepare(slot)
+        except BaseException:
+            self._idle.put_nowait(slot)
+            raise
+        self.leases += 1
+        context, slot['context'] = slot['context'], None
+        try:
+            yield slot['browser'], context
+        finally:
+            reset = asyncio.ensure_future(self._reset(slot, context))
+            self._resets.add(reset)
+            reset.add_done_callback(self._resets.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'size': self.size, 'idle': self._idle.qsize(), 'leases': self.leases,
+                'relaunches': self.relaunches, 'profile': self.profile['name']}
+
+    async def close(self):
+        """Cerrar todos los navegadores"""
+        if self._resets:
+            await asyncio.gather(*self._resets, return_exceptions=True)
+        for slot in self._slots:
+            try:
+                await slot['browser'].close()
+            except Exception:
+                pass
+        if self.playwright:
+            await self.playwright.stop()
+
+
+class Job:
+    """Trabajo de crawl: una o varias URLs con su estado, resultados y eventos"""
+
+    def __init__(self, urls: List[str], options: Dict[str, Any]):
+        self.id = uuid.uuid4().hex[:12]
+        self.urls = urls
+        self.options = options
+        self.status = 'queued'
+        self.created_at = datetime.now().isoformat()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.results: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self.events: List[Dict[str, Any]] = []
+        self.task: Optional[asyncio.Task] = None
+        self._subscribers: set = set()
+
+    def publish(self, event: str, data: Optional[Dict[str, Any]] = None):
+        """Guardar un evento y entregarlo a los clientes suscritos"""
+        entry = {'event': event, 'job': self.id, 'at': datetime.now().isoformat(), 'data': data or {}}
+        self.events.append(entry)
+        for queue in self._subscribers:
+            queue.put_nowait(entry)
+
+    def subscribe(self) -> asyncio.Queue:
+        """Cola con los eventos ya emitidos seguidos de los nuevos"""
+        queue: asyncio.Queue = asyncio.Queue()
+        for entry in self.events:
+            queue.put_nowait(entry)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def describe(self, include_results: bool = True) -> Dict[str, Any]:
+        description = {
+            'id': self.id,
+            'status': self.status,
+            'urls': self.urls,
+            'options': self.options,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'completed': len(self.results),
+            'captcha_found': any(result.get('captcha_found') for result in self.results)
+        }
+        if self.error:
+            description['error'] = self.error
+        if include_results:
+            description['results'] = self.results
+        return description
+
+
+class CrawlService:
+    """Cola de trabajos sobre el pool de navegadores"""
+
+    def __init__(self, pool: BrowserPool, defaults: Optional[Dict[str, Any]] = None,
+                 configure: Optional[Callable[[CaptchaCrawler], None]] = None, store=None,
+                 max_finished_jobs: int = 1000):
+        self.pool = pool
+        self.defaults = {'max_pages': 50, 'product_tabs': 0, 'timeout': 30, 'scope': {}, 'retry': {}}
+        self.defaults.update(defaults or {})
+        self.configure = configure  # Ajustes comunes a todos los crawlers (evidencias, ...)
+        self.store = store
+        self.max_finished_jobs = max_finished_jobs
+        self.jobs: 'OrderedDict[str, Job]' = OrderedDict()
+
+    def submit(self, payload: Dict[str, Any]) -> Job:
+        """Validar y encolar un trabajo"""
+        if not isinstance(payload, dict):
+            raise ValueError('se esperaba un objeto JSON')
+        urls = payload.get('urls') or ([payload['url']] if payload.get('url') else [])
+        if not urls or not all(isinstance(url, str) and url.strip() for url in urls):
+            raise ValueError("se requiere 'url' o una lista 'urls' de URLs")
+        unknown = set(payload) - {'url', 'urls'} - set(JOB_OPTIONS)
+        if unknown:
+            raise ValueError(f"opciones desconocidas: {', '.join(sorted(unknown))}")
+        options = {key: payload[key] for key in JOB_OPTIONS if key in payload}
+        validate_job_options(options)
+
+        job = Job([url.strip() for url in urls], options)
+        self.jobs[job.id] = job
+        self._prune()
+        job.task = asyncio.ensure_future(self._run(job))
+        job.publish('queued', {'urls': job.urls})
+        logger.info(f"Trabajo {job.id} encolado: {len(job.urls)} URLs")
+        return job
+
+    def _prune(self):
+        """Olvidar los trabajos terminados más antiguos"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in TERMINAL_STATUSES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self.jobs[job_id]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.jobs.get(job_id)
+        if job and job.task and not job.task.done():
+            job.task.cancel()
+        return job
+
+    def _make_crawler(self, job: Job) -> CaptchaCrawler:
+        options = dict(self.defaults, **job.options)
+        crawler = CaptchaCrawler(headless=self.pool.headless, timeout=options['timeout'])
+        crawler.max_pages = options['max_pages']
+        crawler.product_tab_fanout = options['product_tabs']
+        crawler.scope_config = dict(options['scope'] or {})
+        crawler.retry_options = dict(options['retry'] or {})
+        crawler.browser_profile = self.pool.profile['name']
+        if self.configure:
+            self.configure(crawler)
+        return crawler
+
+    async def _crawl_site(self, job: Job, url: str) -> Dict[str, Any]:
+        crawler = self._make_crawler(job)
+        crawler.event_listener = lambda event, data: job.publish(event, dict(data, site=url))
+        try:
+            async with self.pool.lease() as (browser, context):
+                try:
+                    await crawler.attach_context(context, browser)
+                    result = await crawler.crawl_url(url)
+                finally:
+                    await crawler.close_browser()
+        except Exception as e:
+            logger.error(f"Error crawleando {url} en el trabajo {job.id}: {e}")
+            result = failed_result(url, str(e))
+        if self.store:
+            result['run_id'] = await asyncio.get_event_loop().run_in_executor(None, self.store.record_run, result)
+        job.results.append(result)
+        job.publish('result', result)
+        return result
+
+    async def _run(self, job: Job):
+        job.status = 'running'
+        job.started_at = datetime.now().isoformat()
+        job.publish('running')
+        try:
+            await asyncio.gather(*(self._crawl_site(job, url) for url in job.urls))
+            job.status = 'done'
+        except asyncio.CancelledError:
+            job.status = 'cancelled'
+        except Exception as e:
+            logger.error(f"Error en el trabajo {job.id}: {e}")
+            job.status = 'failed'
+            job.error = str(e)
+        job.finished_at = datetime.now().isoformat()
+        job.publish(job.status, {'completed': len(job.results), 'error': job.error})
+        logger.info(f"Trabajo {job.id} terminado: {job.status}")
+
+    async def shutdown(self):
+        """Cancelar los trabajos en curso"""
+        tasks = [job.task for job in self.jobs.values() if job.task and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class JobAPI:
+    """API HTTP/1.1 mínima sobre asyncio (sin dependencias) para CrawlService"""
+
+    REASONS = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found',
+               405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+    def __init__(self, service: CrawlService):
+        self.service = service
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: Any):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status} {self.REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body
+        )
+        await writer.drain()
+
+    async def _stream(self, writer: asyncio.StreamWriter, job: Job):
+        """Enviar los eventos del trabajo en NDJSON hasta que termine"""
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+        queue = job.subscribe()
+        try:
+            while True:
+                entry = await queue.get()
+                writer.write(json.dumps(entry, ensure_ascii=False).encode('utf-8') + b'\n')
+                await writer.drain()
+                if entry['event'] in TERMINAL_STATUSES:
+                    break
+        finally:
+            job.unsubscribe(queue)
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        request_line = (await reader.readline()).decode('latin-1').strip()
+        if not request_line:
+            return None
+        method, target = request_line.split()[:2]
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get('content-length') or 0)
+        if length > MAX_BODY_BYTES:
+            raise OverflowError()
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), target.split('?')[0].rstrip('/') or '/', body
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Atender una petición por conexión"""
+        try:
+            try:
+                request = await self._read_request(reader)
+            except OverflowError:
+                await self._send_json(writer, 413, {'error': 'cuerpo demasiado grande'})
+                return
+            except (ValueError, asyncio.IncompleteReadError):
+                await self._send_json(writer, 400, {'error': 'petición HTTP inválida'})
+                return
+            if request:
+                await self._route(writer, *request)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        except Exception as e:
+            logger.error(f"Error atendiendo petición: {e}")
+            try:
+                await self._send_json(writer, 500, {'error': str(e)})
+            except Exception:
+                pass
+        finally:
+            writer.close()
+
+    async def _route(self, writer: asyncio.StreamWriter, method: str, path: str, body: bytes):
+        parts = [part for part in path.split('/') if part]
+
+        if parts == ['health'] and method == 'GET':
+            running = sum(1 for job in self.service.jobs.values() if job.status in ('queued', 'running'))
+            await self._send_json(writer, 200, {'status': 'ok', 'pool': self.service.pool.stats(),
+                                                'jobs_active': running})
+        elif parts == ['jobs'] and method == 'POST':
+            try:
+                job = self.service.submit(json.loads(body or b'{}'))
+            except ValueError as e:  # json.JSONDecodeError incluido
+                await self._send_json(writer, 400, {'error': str(e)})
+                return
+            await self._send_json(writer, 202, job.describe(include_results=False))
+        elif parts == ['jobs'] and method == 'GET':
+            await self._send_json(writer, 200, [job.describe(include_results=False)
+                                                for job in self.service.jobs.values()])
+        elif len(parts) in (2, 3) and parts[0] == 'jobs':
+            job = self.service.jobs.get(parts[1])
+            if job is None:
+                await self._send_json(writer, 404, {'error': 'trabajo no encontrado'})
+            elif len(parts) == 3 and parts[2] == 'stream' and method == 'GET':
+                await self._stream(writer, job)
+            elif len(parts) == 2 and method == 'GET':
+                await self._send_json(writer, 200, job.describe())
+            elif len(parts) == 2 and method == 'DELETE':
+                self.service.cancel(job.id)
+                await self._send_json(writer, 202, job.describe(include_results=False))
+            else:
+                await self._send_json(writer, 405, {'error': 'método no permitido'})
+        else:
+            await self._send_json(writer, 404, {'error': 'ruta no encontrada'})
+
+
+async def serve(service: CrawlService, host: str = '127.0.0.1', port: int = 8765,
+                socket_path: Optional[str] = None):
+    """Servir la API hasta recibir SIGINT o SIGTERM"""
+    api = JobAPI(service)
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = await asyncio.start_unix_server(api.handle, path=socket_path)
+        logger.info(f"Servicio escuchando en unix:{socket_path}")
+    else:
+        server = await asyncio.start_server(api.handle, host, port)
+        logger.info(f"Servicio escuchando en http://{host}:{port}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_event_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signal_number, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Deteniendo el servicio")
+        server.close()
+        await server.wait_closed()
+        await service.shutdown()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Firmas de CAPTCHA con puntuación de confianza para CAPTCHA Crawler by @M4rt1n_0x1337
+
+Cada firma aporta evidencia de un tipo (texto visible, elemento del DOM, host de un
+script o petición de red) con un peso entre 0 y 1. Las evidencias de un mismo
+proveedor se combinan como un OR probabilístico:
+
+    confianza = 1 - (1 - w1) * (1 - w2) * ...
+
+y solo se considera detección cuando la confianza supera el umbral del proveedor.
+Así, una mención suelta de "cloudflare" o "challenge" en el texto de la página no
+basta para lanzar el manejo de CAPTCHA, pero un iframe de challenge sí.
+"""
+
+import re
+from typing import Optional, Dict, List, Any, Iterable
+
+# type: 'text' (texto visible), 'dom' (selector CSS), 'script' (src de <script>), 'network' (URL pedida)
+DEFAULT_SIGNATURES: List[Dict[str, Any]] = [
+    # reCAPTCHA
+    {'provider': 'recaptcha', 'type': 'dom', 'match': 'iframe[src*="recaptcha/api2/anchor"]', 'weight': 0.85},
+    {'provider': 'recaptcha', 'type': 'dom', 'match': 'iframe[src*="recaptcha/enterprise/anchor"]', 'weight': 0.85},
+    {'provider': 'recaptcha', 'type': 'dom', 'match': '.g-recaptcha', 'weight': 0.6},
+    {'provider': 'recaptcha', 'type': 'dom', 'match': '.recaptcha-checkbox-border', 'weight': 0.8},
+    {'provider': 'recaptcha', 'type': 'script', 'match': r'(google\.com|recaptcha\.net)/recaptcha/', 'weight': 0.35},
+    {'provider': 'recaptcha', 'type': 'network', 'match': r'/recaptcha/(api2|enterprise)/(anchor|bframe)', 'weight': 0.6},
+    {'provider': 'recaptcha', 'type': 'text', 'match': r"i'?m not a robot|no soy un robot", 'weight': 0.5},
+
+    # hCaptcha
+    {'provider': 'hcaptcha', 'type': 'dom', 'match': 'iframe[src*="hcaptcha.com"]', 'weight': 0.85},
+    {'provider': 'hcaptcha', 'type': 'dom', 'match': '.h-captcha', 'weight': 0.6},
+    {'provider': 'hcaptcha', 'type': 'script', 'match': r'(js\.)?hcaptcha\.com/1/api\.js', 'weight': 0.4},
+    {'provider': 'hcaptcha', 'type': 'network', 'match': r'hcaptcha\.com/(checksiteconfig|getcaptcha)', 'weight': 0.6},
+
+    # Cloudflare (challenge de página completa)
+    {'provider': 'cloudflare', 'type': 'dom', 'match': '#challenge-form', 'weight': 0.8},
+    {'provider': 'cloudflare', 'type': 'dom', 'match': '.cf-challenge-form', 'weight': 0.8},
+    {'provider': 'cloudflare', 'type': 'dom', 'match': '#challenge-running', 'weight': 0.7},
+    {'provider': 'cloudflare', 'type': 'script', 'match': r'/cdn-cgi/challenge-platform/', 'weight': 0.4},
+    {'provider': 'cloudflare', 'type': 'text', 'match': r'checking (if the site connection is secure|your browser)', 'weight': 0.6},
+    {'provider': 'cloudflare', 'type': 'text', 'match': r'just a moment\.\.\.', 'weight': 0.3},
+
+    # Cloudflare Turnstile
+    {'provider': 'turnstile', 'type': 'dom', 'match': '.cf-turnstile', 'weight': 0.7},
+    {'provider': 'turnstile', 'type': 'dom', 'match': 'iframe[src*="challenges.cloudflare.com"]', 'weight': 0.85},
+    {'provider': 'turnstile', 'type': 'script', 'match': r'challenges\.cloudflare\.com/turnstile/', 'weight': 0.4},
+
+    # FunCaptcha / Arkose Labs
+    {'provider': 'funcaptcha', 'type': 'dom', 'match': 'iframe[src*="arkoselabs.com"]', 'weight': 0.85},
+    {'provider': 'funcaptcha', 'type': 'dom', 'match': '#FunCaptcha', 'weight': 0.7},
+    {'provider': 'funcaptcha', 'type': 'script', 'match': r'(arkoselabs|funcaptcha)\.com', 'weight': 0.4},
+
+    # Genéricos (CAPTCHAs propios, texto de verificación)
+    {'provider': 'generic', 'type': 'dom', 'match': '#captcha', 'weight': 0.5},
+    {'provider': 'generic', 'type': 'dom', 'match': '.captcha', 'weight': 0.45},
+    {'provider': 'generic', 'type': 'dom', 'match': 'img[src*="captcha"]', 'weight': 0.6},
+    {'provider': 'generic', 'type': 'dom', 'match': 'input[name*="captcha"]', 'weight': 0.6},
+    {'provider': 'generic', 'type': 'dom', 'match': '[data-sitekey]', 'weight': 0.5},
+    {'provider': 'generic', 'type': 'text', 'match': r'\bcaptcha\b', 'weight': 0.3},
+    {'provider': 'generic', 'type': 'text', 'match': r'verify (that )?you are (a )?human|verifica que eres humano', 'weight': 0.45},
+    {'provider': 'generic', 'type': 'text', 'match': r'prove you are (a )?human', 'weight': 0.45},
+    {'provider': 'generic', 'type': 'text', 'match': r'security check|comprobación de seguridad', 'weight': 0.15},
+    {'provider': 'generic', 'type': 'text', 'match': r'bot detection|anti-?bot', 'weight': 0.15}
+]
+
+# Confianza mínima por proveedor para considerar que hay un CAPTCHA que manejar
+DEFAULT_THRESHOLDS: Dict[str, float] = {
+    'recaptcha': 0.7,
+    'hcaptcha': 0.7,
+    'cloudflare': 0.7,
+    'turnstile': 0.7,
+    'funcaptcha': 0.7,
+    'generic': 0.75
+}
+
+
+class SignatureModel:
+    """Modelo de firmas ponderadas con umbral por proveedor"""
+
+    def __init__(self, signatures: Optional[List[Dict[str, Any]]] = None,
+                 thresholds: Optional[Dict[str, float]] = None, default_threshold: float = 0.75):
+        self.signatures = [dict(signature) for signature in (signatures or DEFAULT_SIGNATURES)]
+        self.thresholds = dict(DEFAULT_THRESHOLDS if thresholds is None else thresholds)
+        self.default_threshold = default_threshold
+        self._compile()
+
+    def _compile(self):
+        """Precompilar las expresiones regulares por tipo de evidencia"""
+        self._regexes = {}
+        for signature_id, signature in enumerate(self.signatures):
+            if signature['type'] != 'dom':
+                self._regexes[signature_id] = re.compile(signature['match'], re.IGNORECASE)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop('_regexes', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._compile()
+
+    def dom_selectors(self) -> List[str]:
+        """Selectores que hay que evaluar dentro de cada frame"""
+        return [signature['match'] for signature in self.signatures if signature['type'] == 'dom']
+
+    def _match_type(self, signature_type: str, values: Iterable[str]) -> List[int]:
+        values = [value for value in values if value]
+        matched = []
+        for signature_id, signature in enumerate(self.signatures):
+            if signature['type'] != signature_type:
+                continue
+            regex = self._regexes[signature_id]
+            if any(regex.search(value) for value in values):
+                matched.append(signature_id)
+        return matched
+
+    def match_frame(self, text: str, selectors: Iterable[str], scripts: Iterable[str]) -> List[int]:
+        """Firmas presentes en un frame: texto visible, selectores encontrados y scripts"""
+        present = set(selectors)
+        matched = [signature_id for signature_id, signature in enumerate(self.signatures)
+                   if signature['type'] == 'dom' and signature['match'] in present]
+        matched += self._match_type('text', [text])
+        matched += self._match_type('script', scripts)
+        return matched
+
+    def match_network(self, urls: Iterable[str]) -> List[int]:
+        """Firmas presentes en las URLs pedidas por la página"""
+        return self._match_type('network', urls)
+
+    def score(self, matched: Iterable[int]) -> Dict[str, float]:
+        """Confianza por proveedor combinando las evidencias (OR probabilístico)"""
+        remaining: Dict[str, float] = {}
+        for signature_id in set(matched):
+            signature = self.signatures[signature_id]
+            provider = signature['provider']
+            remaining[provider] = remaining.get(provider, 1.0) * (1.0 - signature['weight'])
+        return {provider: round(1.0 - value, 3) for provider, value in remaining.items()}
+
+    def verdict(self, matched: Iterable[int]) -> Optional[Dict[str, Any]]:
+        """Proveedor con mayor confianza, o None si ninguno supera su umbral"""
+        matched = sorted(set(matched))
+        scores = self.score(matched)
+        best = None
+        for provider, confidence in scores.items():
+            threshold = self.thresholds.get(provider, self.default_threshold)
+            if confidence >= threshold and (best is None or confidence > best['confidence']):
+                best = {'provider': provider, 'confidence': confidence, 'threshold': threshold}
+        if best is None:
+            return None
+
+        evidence = [signature_id for signature_id in matched
+                    if self.signatures[signature_id]['provider'] == best['provider']]
+        strongest = max(evidence, key=lambda signature_id: self.signatures[signature_id]['weight'])
+        best['signature_id'] = strongest
+        best['signature'] = self.describe(strongest)
+        best['evidence'] = [self.describe(signature_id) for signature_id in evidence]
+        return best
+
+    def describe(self, signature_id: int) -> str:
+        """Descripción legible de una firma: tipo:patrón"""
+        signature = self.signatures[signature_id]
+        return f"{signature['type']}:{signature['match']}"
+
+    def best_score(self, matched: Iterable[int]) -> Optional[Dict[str, Any]]:
+        """Mejor puntuación aunque no supere el umbral (para registrar detecciones débiles)"""
+        scores = self.score(matched)
+        if not scores:
+            return None
+        provider = max(scores, key=scores.get)
+        return {'provider': provider, 'confidence': scores[provider]}